@@ -3,10 +3,25 @@ import os
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import datetime, timedelta
 import requests
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+import metrics
+import assets
+import fragment_cache
+import http_cache
+import reports
+from http_cache import conditional
+from fragment_cache import bump_version, bump_versions
+from auth import load_cached_user, role_required
+from pos import SaleConflict, apply_sale, load_sale_context, sync_sales, well_formed
+from triage import STATUSES, TriageError, clean_fields, parse_day, report_json, search_reports, triage_reports
+from security import LoginGuard, HashPoolBusy, needs_rehash
 from config import config  # Import the config dictionary
-from models import db, User, InventoryItem, Customer, Sale, SaleItem, Communication, DiseaseReport, Notification, WeatherData
+from models import db, to_money, User, InventoryItem, Customer, Sale, SaleItem, Communication, DiseaseReport, Notification, WeatherData
 
 # Determine environment
 env = os.environ.get('FLASK_ENV', 'development')
@@ -14,6 +29,11 @@ env = os.environ.get('FLASK_ENV', 'development')
 app = Flask(__name__)
 app.config.from_object(config[env])  # Use the config dictionary
 
+# Behind a load balancer request.remote_addr is the balancer's address; take
+# the client's from the trusted X-Forwarded-For hop so login limits are per client
+if app.config['TRUSTED_PROXY_HOPS']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_HOPS'])
+
 # Create upload folder if it doesn't exist
 def create_upload_folder():
     upload_folder = app.config['UPLOAD_FOLDER']
@@ -25,17 +45,32 @@ create_upload_folder()
 # Initialize database
 db.init_app(app)
 
+# Request, SQL and outbound HTTP instrumentation (/metrics)
+metrics.init_app(app)
+
+# Fingerprinted, pre-compressed static assets (python build_assets.py)
+assets.init_app(app)
+
+# {% cache %} blocks in templates, keyed by data versions
+fragment_cache.init_app(app)
+
+# gzip/brotli responses and ETag/304 for @conditional views
+http_cache.init_app(app)
+
 # Initialize login manager
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Login rate limiting and bounded password verification
+login_guard = LoginGuard(app)
+
 # Configure Cohere
 cohere_api_key = app.config['COHERE_API_KEY']
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    return load_cached_user(user_id)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
@@ -89,6 +124,10 @@ def register():
                 user.profile_picture = filename
         
         db.session.add(user)
+        if user_type == 'agrovet':
+            bump_version('agrovets')
+        elif user_type == 'farmer':
+            bump_version('farmers')
         db.session.commit()
         
         flash('Registration successful! Please login.', 'success')
@@ -102,9 +141,24 @@ def login():
         email = request.form.get('email')
         password = request.form.get('password')
         
+        if not login_guard.allow(request.remote_addr, email):
+            metrics.LOGIN_REJECTIONS.labels(reason='rate_limited').inc()
+            flash('Too many login attempts. Please wait a minute and try again.', 'error')
+            return render_template('auth/login.html'), 429
+        
         user = User.query.filter_by(email=email).first()
         
-        if user and user.check_password(password):
+        try:
+            valid = user is not None and login_guard.verify(user.password_hash, password)
+        except HashPoolBusy:
+            metrics.LOGIN_REJECTIONS.labels(reason='busy').inc()
+            flash('The server is busy. Please try again shortly.', 'error')
+            return render_template('auth/login.html'), 503
+        
+        if valid:
+            if needs_rehash(user.password_hash):
+                user.set_password(password)
+                db.session.commit()
             login_user(user)
             flash('Login successful!', 'success')
             return redirect(url_for('index'))
@@ -122,23 +176,19 @@ def logout():
 
 @app.route('/farmer/dashboard')
 @login_required
+@role_required('farmer')
+@conditional('disease_reports', per_user=True)
 def farmer_dashboard():
-    if current_user.user_type != 'farmer':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
     notifications = Notification.query.filter_by(user_id=current_user.id, is_read=False).order_by(Notification.created_at.desc()).limit(5).all()
-    disease_reports = DiseaseReport.query.filter_by(farmer_id=current_user.id).order_by(DiseaseReport.created_at.desc()).limit(10).all()
+    # Left unexecuted: the template only runs it when its cached fragment is stale
+    disease_reports = DiseaseReport.query.filter_by(farmer_id=current_user.id).order_by(DiseaseReport.created_at.desc()).limit(10)
     
     return render_template('farmer/dashboard.html', notifications=notifications, disease_reports=disease_reports)
 
 @app.route('/farmer/detect-disease', methods=['GET', 'POST'])
 @login_required
+@role_required('farmer')
 def detect_disease():
-    if current_user.user_type != 'farmer':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
     if request.method == 'POST':
         if 'plant_image' not in request.files:
             return jsonify({'error': 'No image provided'}), 400
@@ -164,7 +214,8 @@ def detect_disease():
                     'max_tokens': 600
                 }
                 
-                response = requests.post('https://api.cohere.ai/v1/chat', json=chat_payload, headers=headers)
+                with metrics.external_call('cohere'):
+                    response = requests.post('https://api.cohere.ai/v1/chat', json=chat_payload, headers=headers)
                 result = response.json()
                 
                 if response.status_code == 200 and 'text' in result:
@@ -180,6 +231,8 @@ def detect_disease():
                     location=current_user.location
                 )
                 db.session.add(report)
+                bump_version('disease_reports')
+                bump_version('disease_reports', current_user.id)
                 db.session.commit()
                 
                 return jsonify({
@@ -195,20 +248,19 @@ def detect_disease():
 
 @app.route('/farmer/weather')
 @login_required
+@role_required('farmer')
 def farmer_weather():
-    if current_user.user_type != 'farmer':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
     location = request.args.get('location', current_user.location or 'Nairobi')
     
     try:
         weather_url = f"http://api.openweathermap.org/data/2.5/weather?q={location}&appid={app.config['OPENWEATHER_API_KEY']}&units=metric"
-        response = requests.get(weather_url)
+        with metrics.external_call('openweather'):
+            response = requests.get(weather_url)
         weather_data = response.json()
         
         forecast_url = f"http://api.openweathermap.org/data/2.5/forecast?q={location}&appid={app.config['OPENWEATHER_API_KEY']}&units=metric"
-        forecast_response = requests.get(forecast_url)
+        with metrics.external_call('openweather'):
+            forecast_response = requests.get(forecast_url)
         forecast_data = forecast_response.json()
         
         return render_template('farmer/weather.html', weather=weather_data, forecast=forecast_data)
@@ -218,30 +270,29 @@ def farmer_weather():
 
 @app.route('/farmer/agrovets')
 @login_required
+@role_required('farmer')
+@conditional('agrovets')
 def farmer_agrovets():
-    if current_user.user_type != 'farmer':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
-    agrovets = User.query.filter_by(user_type='agrovet', is_active=True).all()
+    agrovets = User.query.filter_by(user_type='agrovet', is_active=True)
     return render_template('farmer/agrovets.html', agrovets=agrovets)
 
 @app.route('/agrovet/dashboard')
 @login_required
+@role_required('agrovet')
+@conditional('inventory', 'customers', 'sales', per_user=True, daily=True)
 def agrovet_dashboard():
-    if current_user.user_type != 'agrovet':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
     total_products = InventoryItem.query.filter_by(agrovet_id=current_user.id).count()
     low_stock_items = InventoryItem.query.filter_by(agrovet_id=current_user.id).filter(InventoryItem.quantity <= InventoryItem.reorder_level).count()
     total_customers = Customer.query.filter_by(agrovet_id=current_user.id).count()
     
-    today = datetime.utcnow().date()
-    today_sales = Sale.query.filter_by(agrovet_id=current_user.id).filter(db.func.date(Sale.sale_date) == today).all()
-    today_revenue = sum(sale.total_amount for sale in today_sales)
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    today_revenue = db.session.query(db.func.coalesce(db.func.sum(Sale.total_amount), 0)).filter(
+        Sale.agrovet_id == current_user.id,
+        Sale.sale_date >= today,
+        Sale.sale_date < today + timedelta(days=1)
+    ).scalar()
     
-    recent_sales = Sale.query.filter_by(agrovet_id=current_user.id).order_by(Sale.sale_date.desc()).limit(10).all()
+    recent_sales = Sale.query.options(joinedload(Sale.customer)).filter_by(agrovet_id=current_user.id).order_by(Sale.sale_date.desc()).limit(10)
     notifications = Notification.query.filter_by(user_id=current_user.id, is_read=False).order_by(Notification.created_at.desc()).limit(5).all()
     
     return render_template('agrovet/dashboard.html', 
@@ -254,21 +305,16 @@ def agrovet_dashboard():
 
 @app.route('/agrovet/inventory')
 @login_required
+@role_required('agrovet')
+@conditional('inventory', per_user=True)
 def agrovet_inventory():
-    if current_user.user_type != 'agrovet':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
     items = InventoryItem.query.filter_by(agrovet_id=current_user.id).all()
     return render_template('agrovet/inventory.html', items=items)
 
 @app.route('/agrovet/inventory/add', methods=['GET', 'POST'])
 @login_required
+@role_required('agrovet')
 def add_inventory():
-    if current_user.user_type != 'agrovet':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
     if request.method == 'POST':
         item = InventoryItem(
             agrovet_id=current_user.id,
@@ -277,14 +323,15 @@ def add_inventory():
             description=request.form.get('description'),
             quantity=int(request.form.get('quantity', 0)),
             unit=request.form.get('unit'),
-            price=float(request.form.get('price')),
-            cost_price=float(request.form.get('cost_price', 0)),
+            price=to_money(request.form.get('price')),
+            cost_price=to_money(request.form.get('cost_price') or 0),
             reorder_level=int(request.form.get('reorder_level', 10)),
             supplier=request.form.get('supplier'),
             sku=request.form.get('sku')
         )
         
         db.session.add(item)
+        bump_version('inventory', current_user.id)
         db.session.commit()
         
         flash('Product added successfully!', 'success')
@@ -294,11 +341,8 @@ def add_inventory():
 
 @app.route('/agrovet/inventory/edit/<int:item_id>', methods=['GET', 'POST'])
 @login_required
+@role_required('agrovet')
 def edit_inventory(item_id):
-    if current_user.user_type != 'agrovet':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
     item = InventoryItem.query.get_or_404(item_id)
     
     if item.agrovet_id != current_user.id:
@@ -311,12 +355,13 @@ def edit_inventory(item_id):
         item.description = request.form.get('description')
         item.quantity = int(request.form.get('quantity', 0))
         item.unit = request.form.get('unit')
-        item.price = float(request.form.get('price'))
-        item.cost_price = float(request.form.get('cost_price', 0))
+        item.price = to_money(request.form.get('price'))
+        item.cost_price = to_money(request.form.get('cost_price') or 0)
         item.reorder_level = int(request.form.get('reorder_level', 10))
         item.supplier = request.form.get('supplier')
         item.sku = request.form.get('sku')
         
+        bump_version('inventory', current_user.id)
         db.session.commit()
         flash('Product updated successfully!', 'success')
         return redirect(url_for('agrovet_inventory'))
@@ -325,115 +370,132 @@ def edit_inventory(item_id):
 
 @app.route('/agrovet/inventory/delete/<int:item_id>', methods=['POST'])
 @login_required
+@role_required('agrovet', api=True)
 def delete_inventory(item_id):
-    if current_user.user_type != 'agrovet':
-        return jsonify({'error': 'Access denied'}), 403
-    
     item = InventoryItem.query.get_or_404(item_id)
     
     if item.agrovet_id != current_user.id:
         return jsonify({'error': 'Access denied'}), 403
     
     db.session.delete(item)
+    bump_version('inventory', current_user.id)
     db.session.commit()
     
     return jsonify({'success': True})
 
 @app.route('/agrovet/pos')
 @login_required
+@role_required('agrovet')
 def agrovet_pos():
-    if current_user.user_type != 'agrovet':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
     items = InventoryItem.query.filter_by(agrovet_id=current_user.id).filter(InventoryItem.quantity > 0).all()
     customers = Customer.query.filter_by(agrovet_id=current_user.id).all()
     return render_template('agrovet/pos.html', items=items, customers=customers)
 
 @app.route('/agrovet/pos/checkout', methods=['POST'])
 @login_required
+@role_required('agrovet', api=True)
 def pos_checkout():
-    if current_user.user_type != 'agrovet':
-        return jsonify({'error': 'Access denied'}), 403
-    
-    data = request.get_json()
-    cart_items = data.get('items', [])
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Malformed sale'}), 400
+    cart_items = data.get('items')
     customer_id = data.get('customer_id')
     payment_method = data.get('payment_method', 'cash')
     
     if not cart_items:
         return jsonify({'error': 'Cart is empty'}), 400
+    if not well_formed(data):
+        return jsonify({'error': 'Malformed sale'}), 400
     
-    total_amount = 0
-    receipt_number = f"RCP{current_user.id}{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
-    
-    sale = Sale(
-        agrovet_id=current_user.id,
-        customer_id=customer_id if customer_id else None,
-        total_amount=0,
-        payment_method=payment_method,
-        receipt_number=receipt_number
-    )
-    db.session.add(sale)
-    db.session.flush()
-    
-    for cart_item in cart_items:
-        item = InventoryItem.query.get(cart_item['id'])
-        if not item or item.agrovet_id != current_user.id:
-            continue
-        
-        quantity = cart_item['quantity']
-        if item.quantity < quantity:
-            return jsonify({'error': f'Insufficient stock for {item.product_name}'}), 400
-        
-        subtotal = item.price * quantity
-        total_amount += subtotal
-        
-        sale_item = SaleItem(
-            sale_id=sale.id,
-            product_name=item.product_name,
-            quantity=quantity,
-            unit_price=item.price,
-            subtotal=subtotal
-        )
-        db.session.add(sale_item)
-        
-        item.quantity -= quantity
-    
-    sale.total_amount = total_amount
-    
-    if customer_id:
-        customer = Customer.query.get(customer_id)
-        if customer:
-            customer.total_purchases += total_amount
-            customer.last_purchase = datetime.utcnow()
+    items_by_id, customers_by_id = load_sale_context(current_user.id, [data])
     
+    try:
+        sale = apply_sale(current_user.id, cart_items, items_by_id, customers_by_id,
+                          customer_id=customer_id,
+                          payment_method=payment_method)
+    except SaleConflict as e:
+        return jsonify({'error': str(e)}), 400
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Malformed sale'}), 400
+    
+    bump_version('sales', current_user.id)
+    bump_version('inventory', current_user.id)
+    if sale.customer_id:
+        bump_version('customers', current_user.id)
     db.session.commit()
+    metrics.POS_SALES_INGESTED.labels(source='checkout').inc()
     
     return jsonify({
         'success': True,
-        'receipt_number': receipt_number,
-        'total_amount': total_amount,
+        'receipt_number': sale.receipt_number,
+        'total_amount': float(sale.total_amount),
         'sale_id': sale.id
     })
 
+# Sales queued by the POS page while offline. Each sale carries a client_uuid,
+# so resending a batch is safe: sales already recorded come back as 'duplicate'.
+# One result per sale: applied, duplicate, conflict (e.g. stock) or invalid.
+@app.route('/agrovet/pos/sync', methods=['POST'])
+@login_required
+@role_required('agrovet', api=True)
+def pos_sync():
+    data = request.get_json(silent=True)
+    sales = data.get('sales') if isinstance(data, dict) else None
+    
+    if not isinstance(sales, list) or not sales:
+        return jsonify({'error': 'No sales provided'}), 400
+    if len(sales) > app.config['POS_SYNC_MAX_BATCH']:
+        return jsonify({'error': f"At most {app.config['POS_SYNC_MAX_BATCH']} sales per batch"}), 413
+    if not all(isinstance(sale, dict) for sale in sales):
+        return jsonify({'error': 'Each sale must be an object'}), 400
+    
+    try:
+        results = sync_sales(current_user.id, sales)
+        if any(result['status'] == 'applied' for result in results):
+            bump_version('sales', current_user.id)
+            bump_version('inventory', current_user.id)
+            bump_version('customers', current_user.id)
+        db.session.commit()
+    except IntegrityError:
+        # Another request recorded one of these sales first; a retry reports it as duplicate
+        db.session.rollback()
+        return jsonify({'error': 'Sales were synced concurrently, please retry'}), 409
+    
+    applied = sum(1 for result in results if result['status'] == 'applied')
+    metrics.POS_SALES_INGESTED.labels(source='sync').inc(applied)
+    
+    return jsonify({'success': True, 'applied': applied, 'results': results})
+
+@app.route('/agrovet/reports/summary')
+@login_required
+@role_required('agrovet', api=True)
+@conditional('sales', per_user=True, daily=True)
+def sales_summary():
+    period = request.args.get('period', 'day')
+    days = request.args.get('days', 30, type=int)
+    
+    if period not in reports.PERIODS:
+        return jsonify({'error': f"period must be one of {', '.join(reports.PERIODS)}"}), 400
+    
+    if not 1 <= days <= app.config['SUMMARY_MAX_DAYS']:
+        return jsonify({'error': f"days must be between 1 and {app.config['SUMMARY_MAX_DAYS']}"}), 400
+    
+    items = reports.load_sale_items(agrovet_id=current_user.id,
+                                    start=datetime.utcnow() - timedelta(days=days))
+    return jsonify(reports.summarize(items, period))
+
 @app.route('/agrovet/crm')
 @login_required
+@role_required('agrovet')
+@conditional('customers', per_user=True)
 def agrovet_crm():
-    if current_user.user_type != 'agrovet':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
     customers = Customer.query.filter_by(agrovet_id=current_user.id).order_by(Customer.created_at.desc()).all()
     return render_template('agrovet/crm.html', customers=customers)
 
 @app.route('/agrovet/crm/add', methods=['GET', 'POST'])
 @login_required
+@role_required('agrovet')
 def add_customer():
-    if current_user.user_type != 'agrovet':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
     if request.method == 'POST':
         customer = Customer(
             agrovet_id=current_user.id,
@@ -446,6 +508,7 @@ def add_customer():
         )
         
         db.session.add(customer)
+        bump_version('customers', current_user.id)
         db.session.commit()
         
         flash('Customer added successfully!', 'success')
@@ -455,11 +518,8 @@ def add_customer():
 
 @app.route('/agrovet/crm/view/<int:customer_id>')
 @login_required
+@role_required('agrovet')
 def view_customer(customer_id):
-    if current_user.user_type != 'agrovet':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
     customer = Customer.query.get_or_404(customer_id)
     
     if customer.agrovet_id != current_user.id:
@@ -467,16 +527,14 @@ def view_customer(customer_id):
         return redirect(url_for('agrovet_crm'))
     
     communications = Communication.query.filter_by(customer_id=customer_id).order_by(Communication.date.desc()).all()
-    purchases = Sale.query.filter_by(customer_id=customer_id).order_by(Sale.sale_date.desc()).all()
+    purchases = Sale.query.filter_by(agrovet_id=current_user.id, customer_id=customer_id).order_by(Sale.sale_date.desc()).all()
     
     return render_template('agrovet/view_customer.html', customer=customer, communications=communications, purchases=purchases)
 
 @app.route('/agrovet/crm/communication/<int:customer_id>', methods=['POST'])
 @login_required
+@role_required('agrovet', api=True)
 def add_communication(customer_id):
-    if current_user.user_type != 'agrovet':
-        return jsonify({'error': 'Access denied'}), 403
-    
     customer = Customer.query.get_or_404(customer_id)
     
     if customer.agrovet_id != current_user.id:
@@ -498,23 +556,84 @@ def add_communication(customer_id):
 
 @app.route('/officer/dashboard')
 @login_required
+@role_required('extension_officer')
+@conditional('disease_reports', 'farmers')
 def officer_dashboard():
-    if current_user.user_type != 'extension_officer':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
-    all_disease_reports = DiseaseReport.query.order_by(DiseaseReport.created_at.desc()).limit(50).all()
-    farmers = User.query.filter_by(user_type='farmer').all()
+    all_disease_reports = DiseaseReport.query.options(joinedload(DiseaseReport.farmer)).order_by(DiseaseReport.created_at.desc()).limit(50)
+    farmers = User.query.filter_by(user_type='farmer')
     
     return render_template('officer/dashboard.html', disease_reports=all_disease_reports, farmers=farmers)
 
+# Disease reports for batch triage, newest first. Filters: region (the report's
+# location), status, since/until (YYYY-MM-DD, inclusive). Pass the returned
+# next_cursor as ?cursor= for the following page.
+@app.route('/officer/reports')
+@login_required
+@role_required('extension_officer', api=True)
+@conditional('disease_reports')
+def officer_reports():
+    limit = min(request.args.get('limit', app.config['TRIAGE_PAGE_SIZE'], type=int),
+                app.config['TRIAGE_MAX_PAGE_SIZE'])
+    status = request.args.get('status')
+    
+    try:
+        if status and status not in STATUSES:
+            raise TriageError(f"status must be one of {', '.join(STATUSES)}")
+        reports, next_cursor = search_reports(
+            region=request.args.get('region'),
+            status=status,
+            since=parse_day(request.args.get('since'), 'since'),
+            until=parse_day(request.args.get('until'), 'until'),
+            cursor=request.args.get('cursor'),
+            limit=max(limit, 1)
+        )
+    except TriageError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'reports': [report_json(report) for report in reports], 'next_cursor': next_cursor})
+
+# Status, diagnosis and confidence for many reports in one transaction. Body:
+# {"reports": [{"id": 1, "disease_detected": "Late blight"}, ...]} plus optional
+# top-level status/disease_detected/confidence applied to every report that
+# does not set its own. One result per report: updated, unchanged, not_found
+# or invalid; each farmer whose reports changed gets one notification.
+@app.route('/officer/reports/triage', methods=['POST'])
+@login_required
+@role_required('extension_officer', api=True)
+def triage_disease_reports():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    entries = data.get('reports')
+    
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'No reports provided'}), 400
+    if len(entries) > app.config['TRIAGE_MAX_BATCH']:
+        return jsonify({'error': f"At most {app.config['TRIAGE_MAX_BATCH']} reports per batch"}), 413
+    if not all(isinstance(entry, dict) for entry in entries):
+        return jsonify({'error': 'Each report must be an object'}), 400
+    
+    try:
+        defaults = clean_fields(data)
+    except TriageError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    results, farmer_ids = triage_reports(entries, defaults, link=url_for('farmer_dashboard'))
+    if farmer_ids:
+        bump_version('disease_reports')
+        bump_versions('disease_reports', farmer_ids)
+        bump_versions('notifications', farmer_ids)
+    db.session.commit()
+    
+    updated = sum(1 for result in results if result['result'] == 'updated')
+    metrics.DISEASE_REPORTS_TRIAGED.inc(updated)
+    
+    return jsonify({'success': True, 'updated': updated, 'notified': len(farmer_ids), 'results': results})
+
 @app.route('/institution/dashboard')
 @login_required
+@role_required('learning_institution')
 def institution_dashboard():
-    if current_user.user_type != 'learning_institution':
-        flash('Access denied', 'error')
-        return redirect(url_for('index'))
-    
     return render_template('institution/dashboard.html')
 
 @app.route('/api/chat', methods=['POST'])
@@ -540,7 +659,8 @@ def chat():
             'preamble': 'You are a helpful agricultural assistant specializing in farming, crops, livestock, and agricultural practices. Provide practical, concise advice to farmers.'
         }
         
-        response = requests.post('https://api.cohere.ai/v1/chat', json=chat_payload, headers=headers)
+        with metrics.external_call('cohere'):
+            response = requests.post('https://api.cohere.ai/v1/chat', json=chat_payload, headers=headers)
         result = response.json()
         
         if response.status_code == 200 and 'text' in result:
@@ -578,7 +698,8 @@ def test_api():
             'max_tokens': 20
         }
         
-        response = requests.post('https://api.cohere.ai/v1/chat', json=test_payload, headers=headers)
+        with metrics.external_call('cohere'):
+            response = requests.post('https://api.cohere.ai/v1/chat', json=test_payload, headers=headers)
         result = response.json()
         
         if response.status_code == 200 and 'text' in result:
@@ -599,7 +720,8 @@ def list_models():
             'Content-Type': 'application/json',
         }
         
-        response = requests.get('https://api.cohere.ai/v1/models', headers=headers)
+        with metrics.external_call('cohere'):
+            response = requests.get('https://api.cohere.ai/v1/models', headers=headers)
         result = response.json()
         
         if response.status_code == 200:
@@ -625,6 +747,7 @@ def mark_notification_read(notification_id):
         return jsonify({'error': 'Access denied'}), 403
     
     notification.is_read = True
+    bump_version('notifications', current_user.id)
     db.session.commit()
     
     return jsonify({'success': True})
@@ -640,7 +763,7 @@ def format_datetime(value):
 def health_check():
     try:
         # Test database connection
-        db.session.execute('SELECT 1')
+        db.session.execute(text('SELECT 1'))
         return jsonify({
             'status': 'healthy',
             'database': 'connected',
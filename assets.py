@@ -0,0 +1,59 @@
+# assets.py
+"""Serve the fingerprinted assets produced by build_assets.py.
+
+url_for('static', filename='css/style.css') is rewritten to the hashed file
+listed in static/dist/manifest.json. Hashed files never change, so they are
+sent with a one-year immutable Cache-Control and, when the client accepts it,
+as the pre-compressed .br/.gz variant.
+"""
+import json
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Preferred first
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, 'dist', 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_app(app):
+    manifest = load_manifest(app.static_folder)
+    fingerprinted = set(manifest.values())
+    app.extensions['asset_manifest'] = manifest
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    def static(filename):
+        if filename not in fingerprinted:
+            return app.send_static_file(filename)
+
+        mimetype = mimetypes.guess_type(filename)[0]
+        path, encoding = filename, None
+        for name, suffix in PRECOMPRESSED:
+            if name in request.accept_encodings and os.path.exists(
+                    os.path.join(app.static_folder, filename + suffix)):
+                path, encoding = filename + suffix, name
+                break
+
+        response = send_from_directory(app.static_folder, path, mimetype=mimetype,
+                                       max_age=IMMUTABLE_MAX_AGE)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
@@ -0,0 +1,142 @@
+# auth.py
+"""Cached user loading and role checks.
+
+Flask-Login calls the user loader on every authenticated request. Instead of
+a users-table lookup each time, the loader keeps a short-lived snapshot of the
+user's identity, role and active flag. Entries are dropped whenever the User
+row is updated or deleted in this process. Such changes also bump the 'users'
+data version, which every worker checks at most every USER_CACHE_CHECK_SECONDS
+and drops its whole cache when it has moved, so a deactivated user is logged
+out everywhere within seconds rather than after USER_CACHE_TTL. The user's own
+'users' version (their name and picture in the header) and the listing of
+their type ('agrovets', 'farmers') are bumped too, for cached pages.
+"""
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, flash, g, jsonify, redirect, url_for
+from flask_login import UserMixin, current_user
+from sqlalchemy import event, func, inspect
+
+import metrics
+from fragment_cache import bump_versions, data_version
+from models import db, User, Notification
+
+# Columns copied into the snapshot. password_hash is deliberately left out.
+CACHED_FIELDS = ('id', 'email', 'full_name', 'user_type', 'profile_picture',
+                 'phone_number', 'location', 'latitude', 'longitude', 'is_active')
+
+MAX_CACHED_USERS = 4096
+
+# Unread notifications listed in the header
+HEADER_NOTIFICATIONS = 5
+
+# Data-version scope of the pages listing users of each type
+USER_TYPE_SCOPES = {'agrovet': 'agrovets', 'farmer': 'farmers'}
+
+
+class CachedUser(UserMixin):
+    """Read-only stand-in for User that costs no query to build."""
+
+    def __init__(self, user):
+        for field in CACHED_FIELDS:
+            setattr(self, field, getattr(user, field))
+
+    # UserMixin defines is_active as a property; the snapshot stores the column
+    is_active = None
+
+    @property
+    def notifications(self):
+        return Notification.query.filter_by(user_id=self.id).all()
+
+    @property
+    def unread_notifications(self):
+        """(newest unread notifications, total unread), one query per request."""
+        if 'unread_notifications' not in g:
+            total = func.count().over().label('total')
+            rows = (db.session.query(Notification, total)
+                    .filter(Notification.user_id == self.id, Notification.is_read.is_(False))
+                    .order_by(Notification.created_at.desc())
+                    .limit(HEADER_NOTIFICATIONS).all())
+            g.unread_notifications = ([row[0] for row in rows], rows[0].total if rows else 0)
+        return g.unread_notifications
+
+
+_cache = {}
+_lock = threading.Lock()
+# 'users' data version this worker's cache was last checked against, and when
+_checked = {'version': None, 'at': float('-inf')}
+
+
+def _check_other_workers(now):
+    """Drop the cache if a user was changed in any worker since the last check."""
+    if now - _checked['at'] < current_app.config['USER_CACHE_CHECK_SECONDS']:
+        return
+    version = data_version('users')
+    with _lock:
+        if version != _checked['version']:
+            _cache.clear()
+            _checked['version'] = version
+        _checked['at'] = now
+
+
+def load_cached_user(user_id):
+    """Return a CachedUser for ``user_id``, or None if missing or deactivated."""
+    user_id = int(user_id)
+    now = time.monotonic()
+    _check_other_workers(now)
+
+    with _lock:
+        entry = _cache.get(user_id)
+    if entry and entry[0] > now:
+        metrics.record_cache('user', True)
+        return entry[1]
+
+    metrics.record_cache('user', False)
+    user = db.session.get(User, user_id)
+    if user is None or not user.is_active:
+        invalidate_user(user_id)
+        return None
+
+    cached = CachedUser(user)
+    with _lock:
+        if len(_cache) >= MAX_CACHED_USERS:
+            _cache.clear()
+        _cache[user_id] = (now + current_app.config['USER_CACHE_TTL'], cached)
+    return cached
+
+
+def invalidate_user(user_id):
+    with _lock:
+        _cache.pop(user_id, None)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_on_change(mapper, connection, target):
+    invalidate_user(target.id)
+    bump_versions('users', [0, target.id], connection=connection)
+    # A user whose type changed leaves one listing and joins another
+    user_types = set(inspect(target).attrs.user_type.history.sum()) | {target.user_type}
+    for scope in sorted({USER_TYPE_SCOPES[t] for t in user_types if t in USER_TYPE_SCOPES}):
+        bump_versions(scope, [0], connection=connection)
+
+
+def role_required(*user_types, api=False):
+    """Reject users whose user_type is not in ``user_types``.
+
+    Page routes flash and redirect to the index; ``api=True`` routes answer
+    with a JSON 403 instead. Use below ``@login_required``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if current_user.user_type not in user_types:
+                if api:
+                    return jsonify({'error': 'Access denied'}), 403
+                flash('Access denied', 'error')
+                return redirect(url_for('index'))
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
@@ -0,0 +1,93 @@
+# benchmarks/bench_http_cache.py
+"""Bytes on the wire for list pages: plain, gzip, brotli and 304 revalidation.
+
+Exits with status 1 if a page is not smaller compressed than plain or a
+matching If-None-Match does not get an empty 304 (suite.wire_problems).
+
+    python benchmarks/bench_http_cache.py [--items 500]
+"""
+import argparse
+import sys
+
+import datagen
+
+datagen.use_database('bench_http_cache')
+
+import http_cache  # noqa: E402
+from app import app  # noqa: E402
+from models import db, User, InventoryItem, Customer, DiseaseReport  # noqa: E402
+from suite import wire_problems  # noqa: E402
+
+PAGES = [
+    ('agrovet@bench.test', '/agrovet/inventory'),
+    ('agrovet@bench.test', '/agrovet/crm'),
+    ('agrovet@bench.test', '/agrovet/dashboard'),
+    ('officer@bench.test', '/officer/dashboard'),
+]
+
+ENCODINGS = [('identity', 'identity'), ('gzip', 'gzip'), ('br', 'br, gzip')]
+
+
+def seed(items):
+    with app.app_context():
+        agrovet = User(email='agrovet@bench.test', full_name='Bench Agrovet', user_type='agrovet')
+        officer = User(email='officer@bench.test', full_name='Bench Officer', user_type='extension_officer')
+        farmer = User(email='farmer@bench.test', full_name='Bench Farmer', user_type='farmer')
+        for user in (agrovet, officer, farmer):
+            user.set_password('bench')
+        db.session.add_all([agrovet, officer, farmer])
+        db.session.flush()
+
+        db.session.add_all(InventoryItem(agrovet_id=agrovet.id, product_name=f'Product {i}',
+                                         category='Fertilizer', quantity=i % 40, unit='kg',
+                                         price=100 + i, cost_price=80 + i, sku=f'SKU{i:05d}')
+                           for i in range(items))
+        db.session.add_all(Customer(agrovet_id=agrovet.id, name=f'Customer {i}', phone='0700000000',
+                                    email=f'customer{i}@bench.test', customer_type='farmer')
+                           for i in range(items))
+        db.session.add_all(DiseaseReport(farmer_id=farmer.id, location='Nakuru',
+                                         plant_description='Yellow spots on maize leaves')
+                           for i in range(50))
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=500)
+    args = parser.parse_args()
+
+    seed(args.items)
+    encodings = ['gzip', 'br'] if http_cache.brotli is not None else ['gzip']
+    failures = []
+    clients = {}
+    print(f"{'page':<22}" + ''.join(f'{name:>11}' for name, _ in ENCODINGS) + f"{'304':>8}")
+    for email, path in PAGES:
+        client = clients.get(email)
+        if client is None:
+            client = clients[email] = app.test_client()
+            client.post('/login', data={'email': email, 'password': 'bench'})
+            client.get('/', follow_redirects=True)  # consume the login flash so pages are cacheable
+
+        sizes = []
+        etag = None
+        for _, accept in ENCODINGS:
+            response = client.get(path, headers={'Accept-Encoding': accept})
+            assert response.status_code == 200, (path, response.status_code)
+            sizes.append(len(response.data))
+            etag = response.headers.get('ETag')
+
+        revalidated = client.get(path, headers={'If-None-Match': etag, 'Accept-Encoding': 'br, gzip'})
+        print(f'{path:<22}' + ''.join(f'{size:>11}' for size in sizes) + f'{len(revalidated.data):>8}')
+        failures += [f'{path}: {problem}' for problem in
+                     wire_problems(client, path, encodings, app.config['COMPRESS_MIN_SIZE'], require_etag=True)]
+
+    if failures:
+        print(f'\n{len(failures)} problem(s):')
+        for failure in failures:
+            print(f'  {failure}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
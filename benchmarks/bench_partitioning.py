@@ -0,0 +1,133 @@
+# benchmarks/bench_partitioning.py
+"""Tenant query latency as the platform's total sales volume grows.
+
+The busiest shop of a datagen data set (--shops agrovets, and the first
+step's sale items) is measured while other shops' sales are added in steps.
+Tenant-scoped queries should stay flat; the platform-wide query is there for
+contrast. Against Postgres the tables are first converted with
+partitioning.py.
+
+    python benchmarks/bench_partitioning.py [--steps 100000,400000,1600000]
+    python benchmarks/bench_partitioning.py --database-url postgresql://.../empty_db
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import datagen
+
+ITEMS_PER_SALE = 3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--steps', default='100000,400000,1600000',
+                        help='total sale items after each growth step')
+    parser.add_argument('--shops', type=int, default=1000, help='agrovets seeded')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--database-url', help='an empty database to use instead of SQLite')
+    args = parser.parse_args()
+    steps = [int(step) for step in args.steps.split(',')]
+
+    datagen.use_database('bench_partitioning', args.database_url)
+
+    from sqlalchemy import func, insert, text
+    import reports
+    from app import app
+    from models import db, User, InventoryItem, Sale, SaleItem
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    ids = {'sale': 0, 'item': 0}
+
+    def add_sales(shops, count):
+        """Insert ``count`` sales of ITEMS_PER_SALE items for random ``shops``."""
+        for first in range(0, count, datagen.CHUNK):
+            sales, items = [], []
+            for _ in range(min(datagen.CHUNK, count - first)):
+                ids['sale'] += 1
+                shop = rng.choice(shops)
+                sales.append({'id': ids['sale'], 'agrovet_id': shop, 'total_amount': Decimal('300.00'),
+                              'payment_method': 'cash', 'receipt_number': f'BENCH{ids["sale"]}',
+                              'sale_date': now - timedelta(seconds=rng.randrange(datagen.HISTORY_DAYS * 86400))})
+                for _ in range(ITEMS_PER_SALE):
+                    ids['item'] += 1
+                    items.append({'id': ids['item'], 'sale_id': ids['sale'], 'agrovet_id': shop,
+                                  'product_name': 'Product', 'quantity': 1, 'unit_price': Decimal('100.00'),
+                                  'unit_cost': Decimal('80.00'), 'subtotal': Decimal('100.00')})
+            db.session.execute(insert(Sale), sales)
+            db.session.execute(insert(SaleItem), items)
+            db.session.commit()
+
+    month_ago = now - timedelta(days=30)
+    queries = {
+        'revenue 30d': lambda tenant: db.session.query(func.sum(Sale.total_amount)).filter(
+            Sale.agrovet_id == tenant, Sale.sale_date >= month_ago).scalar(),
+        'recent sales': lambda tenant: Sale.query.filter_by(agrovet_id=tenant)
+            .order_by(Sale.sale_date.desc()).limit(10).all(),
+        'items sold': lambda tenant: db.session.query(func.sum(SaleItem.quantity)).filter(
+            SaleItem.agrovet_id == tenant).scalar(),
+        'report 30d': lambda tenant: reports.load_sale_items(agrovet_id=tenant, start=month_ago),
+        'inventory': lambda tenant: InventoryItem.query.filter_by(agrovet_id=tenant).all(),
+        'platform 30d': lambda tenant: db.session.query(func.count(Sale.id)).filter(
+            Sale.sale_date >= month_ago).scalar(),
+    }
+
+    def measure(tenant):
+        timings = {}
+        for name, query in queries.items():
+            query(tenant)  # warm the cache
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                query(tenant)
+                samples.append((time.perf_counter() - start) * 1000)
+                db.session.expunge_all()
+            timings[name] = statistics.median(samples)
+        return timings
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        datagen.generate('tiny', agrovets=args.shops, sale_items=steps[0], progress=None)
+        tenant = User.query.filter_by(email=datagen.ACCOUNTS['agrovet']).one().id
+        others = [shop_id for shop_id, in db.session.query(User.id).filter(
+            User.user_type == 'agrovet', User.id != tenant)]
+        tenant_items = SaleItem.query.filter_by(agrovet_id=tenant).count()
+        ids['sale'] = db.session.query(func.max(Sale.id)).scalar()
+        ids['item'] = db.session.query(func.max(SaleItem.id)).scalar()
+
+        if dialect == 'postgresql':
+            # Converted after the year of sales exists, so monthly partitions
+            # are created from its first month
+            import partitioning
+            db.session.close()
+            with db.engine.begin() as conn:
+                partitioning.partition_tables(conn, app.config)
+
+        print(f'{dialect}: tenant has {tenant_items:,} of the sale items')
+        print(f"{'sale items':>12}" + ''.join(f'{name:>14}' for name in queries))
+        results = []
+        for total in steps:
+            started = time.perf_counter()
+            add_sales(others, max(0, (total - ids['item']) // ITEMS_PER_SALE))
+            if dialect == 'postgresql':
+                # Settle the freshly loaded rows so autovacuum does not run during timing
+                db.session.close()
+                with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                    conn.execute(text('VACUUM ANALYZE'))
+            load_seconds = time.perf_counter() - started
+            timings = measure(tenant)
+            results.append(timings)
+            print(f"{ids['item']:>12,}" + ''.join(f'{timings[name]:>12.2f}ms' for name in queries)
+                  + f'   (loaded in {load_seconds:.0f}s)')
+
+        growth = ids['item'] / steps[0]
+        print(f"{f'x{growth:.0f} rows':>12}" + ''.join(f'{results[-1][name] / results[0][name]:>13.1f}x'
+                                                        for name in queries))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_reports.py
+"""Sales summary: NumPy reporting layer vs. summing ORM rows in Python.
+
+    python benchmarks/bench_reports.py [--items 1000000] [--skip-orm]
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import datagen
+
+datagen.use_database('bench_reports')
+
+from sqlalchemy import insert  # noqa: E402
+
+import reports  # noqa: E402
+from app import app  # noqa: E402
+from models import db, User, Sale, SaleItem  # noqa: E402
+
+ITEMS_PER_SALE = 3
+CHUNK = 50000
+
+
+def seed(items, seed=42):
+    rng = random.Random(seed)
+    agrovet = User(email='agrovet@bench.test', full_name='Bench Agrovet', user_type='agrovet',
+                   password_hash='!')
+    db.session.add(agrovet)
+    db.session.commit()
+
+    start = datetime(2025, 1, 1)
+    sales = items // ITEMS_PER_SALE
+    for first in range(0, sales, CHUNK):
+        batch = range(first + 1, min(first + CHUNK, sales) + 1)
+        db.session.execute(insert(Sale), [
+            {'id': sale_id, 'agrovet_id': agrovet.id, 'total_amount': 0,
+             'receipt_number': f'BENCH{sale_id}', 'payment_method': 'cash',
+             'sale_date': start + timedelta(seconds=rng.randrange(365 * 86400))}
+            for sale_id in batch])
+        rows = []
+        for sale_id in batch:
+            for _ in range(ITEMS_PER_SALE):
+                quantity = rng.randint(1, 10)
+                price = Decimal(rng.randrange(50, 500000)) / 100
+                cost = (price * Decimal('0.8')).quantize(Decimal('0.01')) if rng.random() < 0.9 else None
+                rows.append({'sale_id': sale_id, 'agrovet_id': agrovet.id, 'product_name': 'Product', 'quantity': quantity,
+                             'unit_price': price, 'unit_cost': cost, 'subtotal': price * quantity})
+        db.session.execute(insert(SaleItem), rows)
+        db.session.commit()
+    return agrovet.id
+
+
+def orm_summary(agrovet_id):
+    revenue = cost = costed_revenue = Decimal('0')
+    items_sold = 0
+    per_day = defaultdict(Decimal)
+    query = (db.session.query(SaleItem, Sale.sale_date).join(Sale, SaleItem.sale_id == Sale.id)
+             .filter(Sale.agrovet_id == agrovet_id).yield_per(10000))
+    for item, sale_date in query:
+        revenue += item.subtotal
+        items_sold += item.quantity
+        if item.unit_cost is not None:
+            costed_revenue += item.subtotal
+            cost += item.unit_cost * item.quantity
+        per_day[sale_date.date()] += item.subtotal
+    return {'revenue': revenue, 'cost': cost, 'margin': costed_revenue - cost,
+            'items_sold': items_sold, 'periods': len(per_day)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000000)
+    parser.add_argument('--skip-orm', action='store_true', help='only time the NumPy path')
+    args = parser.parse_args()
+
+    with app.app_context():
+        started = time.perf_counter()
+        agrovet_id = seed(args.items)
+        print(f'Seeded {args.items} sale items in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        items = reports.load_sale_items(agrovet_id=agrovet_id)
+        loaded = time.perf_counter()
+        summary = reports.summarize(items, 'day')
+        done = time.perf_counter()
+        numpy_elapsed = done - started
+        print(f'numpy: load {loaded - started:.2f}s + summarize {(done - loaded) * 1000:.1f}ms '
+              f'= {numpy_elapsed:.2f}s  revenue={summary["revenue"]} margin={summary["margin"]} '
+              f'days={len(summary["periods"])}')
+
+        if not args.skip_orm:
+            db.session.expunge_all()
+            started = time.perf_counter()
+            orm = orm_summary(agrovet_id)
+            elapsed = time.perf_counter() - started
+            print(f'orm:   {elapsed:.2f}s  revenue={orm["revenue"]} margin={orm["margin"]} '
+                  f'days={orm["periods"]}')
+            assert orm['revenue'] == summary['revenue'] and orm['margin'] == summary['margin']
+            print(f'speedup: {elapsed / numpy_elapsed:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
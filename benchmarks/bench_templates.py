@@ -0,0 +1,121 @@
+# benchmarks/bench_templates.py
+"""Dashboard render time with and without the fragment cache.
+
+Seeds a throwaway SQLite database, logs in as each role and requests its
+dashboard through the Flask test client.
+
+    python benchmarks/bench_templates.py [--repeat 50]
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import datagen
+
+datagen.use_database('bench_templates')
+
+from sqlalchemy import event  # noqa: E402
+
+from app import app  # noqa: E402
+from fragment_cache import store  # noqa: E402
+from models import db, User, Customer, Sale, DiseaseReport  # noqa: E402
+
+PAGES = [
+    ('farmer@bench.test', '/farmer/dashboard'),
+    ('farmer@bench.test', '/farmer/agrovets'),
+    ('agrovet@bench.test', '/agrovet/dashboard'),
+    ('officer@bench.test', '/officer/dashboard'),
+    ('institution@bench.test', '/institution/dashboard'),
+]
+
+
+def seed(agrovets=300, farmers=500, reports=2000):
+    with app.app_context():
+        users = [
+            User(email='farmer@bench.test', full_name='Bench Farmer', user_type='farmer'),
+            User(email='agrovet@bench.test', full_name='Bench Agrovet', user_type='agrovet'),
+            User(email='officer@bench.test', full_name='Bench Officer', user_type='extension_officer'),
+            User(email='institution@bench.test', full_name='Bench Institution', user_type='learning_institution'),
+        ]
+        for user in users:
+            user.set_password('bench')
+        # Directory-only accounts never log in, so skip the deliberately slow hashing
+        users += [User(email=f'agrovet{i}@bench.test', full_name=f'Agrovet {i}', user_type='agrovet',
+                       location='Nakuru', phone_number='0700000000', password_hash='!')
+                  for i in range(agrovets)]
+        users += [User(email=f'farmer{i}@bench.test', full_name=f'Farmer {i}', user_type='farmer',
+                       password_hash='!') for i in range(farmers)]
+        db.session.add_all(users)
+        db.session.flush()
+
+        farmer, agrovet = users[0], users[1]
+        customer = Customer(agrovet_id=agrovet.id, name='Bench Customer')
+        db.session.add(customer)
+        db.session.flush()
+
+        now = datetime.utcnow()
+        db.session.add_all(Sale(agrovet_id=agrovet.id, customer_id=customer.id if i % 2 else None,
+                                sale_date=now - timedelta(minutes=i), total_amount=100 + i,
+                                payment_method='cash', receipt_number=f'BENCH{i}')
+                           for i in range(500))
+        db.session.add_all(DiseaseReport(farmer_id=farmer.id if i % 5 == 0 else users[4 + agrovets + i % farmers].id,
+                                         plant_description='Yellow spots on maize leaves ' * 3,
+                                         treatment_recommendation='Apply fungicide.',
+                                         location='Nakuru', created_at=now - timedelta(minutes=i))
+                           for i in range(reports))
+        db.session.commit()
+
+
+def measure(client, path, repeat):
+    queries = []
+
+    def count(*args):
+        queries[-1] += 1
+
+    timings = []
+    # Each request gets its own app context, as in production, so nothing
+    # memoized on g (data versions, notifications) carries over between them
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        for _ in range(repeat):
+            queries.append(0)
+            start = time.perf_counter()
+            response = client.get(path)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, (path, response.status_code)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return statistics.median(timings), statistics.median(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    seed()
+    clients = {}
+    print(f"{'page':<26}{'uncached ms':>12}{'queries':>9}{'cached ms':>11}{'queries':>9}{'speedup':>9}")
+    for email, path in PAGES:
+        client = clients.get(email)
+        if client is None:
+            client = clients[email] = app.test_client()
+            client.post('/login', data={'email': email, 'password': 'bench'})
+            client.get('/', follow_redirects=True)  # consume the login flash
+
+        app.config['FRAGMENT_CACHE_ENABLED'] = False
+        cold_ms, cold_queries = measure(client, path, args.repeat)
+        app.config['FRAGMENT_CACHE_ENABLED'] = True
+        store.clear()
+        client.get(path)  # warm the fragments
+        warm_ms, warm_queries = measure(client, path, args.repeat)
+
+        print(f"{path:<26}{cold_ms:>12.2f}{cold_queries:>9.0f}{warm_ms:>11.2f}{warm_queries:>9.0f}"
+              f"{cold_ms / warm_ms:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
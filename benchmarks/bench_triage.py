@@ -0,0 +1,122 @@
+# benchmarks/bench_triage.py
+"""Disease report triage: one report per transaction vs. a triage batch, and
+OFFSET vs. keyset pages when listing deep into an outbreak.
+
+Seeds datagen's tiny data set with --farmers farmers and --reports disease
+reports.
+
+    python benchmarks/bench_triage.py [--reports 200000] [--batch 1000]
+    python benchmarks/bench_triage.py --database-url postgresql://.../empty_db
+"""
+import argparse
+import random
+import statistics
+import time
+
+import datagen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=200000, help='disease reports seeded')
+    parser.add_argument('--farmers', type=int, default=20000, help='farmers seeded')
+    parser.add_argument('--batch', type=int, default=1000, help='reports triaged per run')
+    parser.add_argument('--page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--database-url', help='an empty database to use instead of SQLite')
+    args = parser.parse_args()
+
+    datagen.use_database('bench_triage', args.database_url)
+
+    from sqlalchemy import event
+    from sqlalchemy.orm import joinedload
+    import triage
+    from app import app
+    from fragment_cache import bump_version, bump_versions
+    from models import db, DiseaseReport, Notification
+
+    rng = random.Random(42)
+    statements = [0]
+
+    def count(*_):
+        statements[0] += 1
+
+    with app.app_context():
+        datagen.generate('tiny', farmers=args.farmers, disease_reports=args.reports, progress=None)
+        event.listen(db.engine, 'before_cursor_execute', count)
+        print(f'{db.engine.dialect.name}: {args.reports:,} reports from {args.farmers:,} farmers')
+
+    def one_at_a_time(ids, status):
+        """What the dashboard offers today: open a report, save it, repeat."""
+        for report_id in ids:
+            with app.test_request_context():
+                report = db.session.get(DiseaseReport, report_id)
+                report.status = status
+                report.disease_detected = 'Late Blight'
+                report.confidence = 0.9
+                db.session.add(Notification(user_id=report.farmer_id, title=f'Disease report {status}',
+                                            message='An extension officer reviewed your report.',
+                                            notification_type='disease_report'))
+                bump_version('disease_reports')
+                bump_version('disease_reports', report.farmer_id)
+                bump_version('notifications', report.farmer_id)
+                db.session.commit()
+                db.session.remove()
+
+    def batch(ids, status):
+        with app.test_request_context():
+            _, farmer_ids = triage.triage_reports(
+                [{'id': report_id} for report_id in ids],
+                {'status': status, 'disease_detected': 'Late Blight', 'confidence': 0.9})
+            bump_version('disease_reports')
+            bump_versions('disease_reports', farmer_ids)
+            bump_versions('notifications', farmer_ids)
+            db.session.commit()
+            db.session.remove()
+
+    print(f'\nTriage {args.batch} reports')
+    ids = rng.sample(range(1, args.reports + 1), args.batch)
+    results = {}
+    for name, run in (('one at a time', one_at_a_time), ('batch', batch)):
+        statements[0] = 0
+        started = time.perf_counter()
+        # Same reports, so the batch sets a different status to actually change them
+        run(ids, 'reviewed' if name == 'batch' else 'resolved')
+        results[name] = time.perf_counter() - started
+        print(f'{name:>16}: {results[name] * 1000:9.1f}ms  {statements[0]:>6} statements')
+    print(f"{'speedup':>16}: {results['one at a time'] / results['batch']:9.1f}x")
+
+    def timed(query):
+        samples = []
+        with app.app_context():
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                query()
+                samples.append((time.perf_counter() - started) * 1000)
+                db.session.remove()
+        return statistics.median(samples)
+
+    print(f'\nList page of {args.page} (region filter), by depth')
+    print(f"{'depth':>16}{'OFFSET':>12}{'keyset':>12}")
+    with app.app_context():
+        region = datagen.COUNTIES[0][0]
+        total = DiseaseReport.query.filter_by(location=region).count()
+
+    def ordered():
+        return (DiseaseReport.query.options(joinedload(DiseaseReport.farmer)).filter_by(location=region)
+                .order_by(DiseaseReport.created_at.desc(), DiseaseReport.id.desc()))
+
+    for fraction in (0, 0.5, 0.95):
+        depth = int(total * fraction) // args.page * args.page
+        cursor = None
+        if depth:
+            # The cursor the previous page would have returned
+            with app.app_context():
+                cursor = triage.encode_cursor(ordered().offset(depth - 1).first())
+        offset = timed(lambda: ordered().offset(depth).limit(args.page).all())
+        keyset = timed(lambda: triage.search_reports(region=region, cursor=cursor, limit=args.page))
+        print(f'{depth:>16,}{offset:>10.2f}ms{keyset:>10.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
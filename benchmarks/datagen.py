@@ -0,0 +1,457 @@
+# benchmarks/datagen.py
+"""Seeded synthetic data for every model, at benchmark volumes.
+
+    python benchmarks/datagen.py --scale small [--database-url URL] [--seed 42]
+
+The same scale and seed always produce the same rows. Rows are generated with
+NumPy in chunks and written with Core inserts, so memory stays flat even at
+national scale. One login per role (ACCOUNTS, password PASSWORD) is included
+for driving the app; the agrovet account is the platform's busiest shop.
+Benchmarks call use_database() before importing the app.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import func, text  # noqa: E402
+
+from models import (db, User, InventoryItem, Customer, Sale, SaleItem, Communication,  # noqa: E402
+                    DiseaseReport, Notification, WeatherData)
+from security import hash_password  # noqa: E402
+
+SCALES = {
+    'tiny': dict(agrovets=20, farmers=2000, officers=5, institutions=2, products_per_agrovet=40,
+                 customers_per_agrovet=30, sale_items=30000, disease_reports=5000,
+                 communications=500, notifications=5000),
+    'small': dict(agrovets=200, farmers=20000, officers=20, institutions=10, products_per_agrovet=60,
+                  customers_per_agrovet=100, sale_items=500000, disease_reports=50000,
+                  communications=10000, notifications=50000),
+    'national': dict(agrovets=10000, farmers=1000000, officers=500, institutions=200,
+                     products_per_agrovet=90, customers_per_agrovet=300, sale_items=50000000,
+                     disease_reports=5000000, communications=1000000, notifications=5000000),
+}
+
+PASSWORD = 'bench'
+ACCOUNTS = {
+    'agrovet': 'agrovet@bench.test',
+    'farmer': 'farmer@bench.test',
+    'extension_officer': 'officer@bench.test',
+    'learning_institution': 'institution@bench.test',
+}
+
+CHUNK = 20000
+HISTORY_DAYS = 365
+
+# (county, latitude, longitude)
+COUNTIES = [
+    ('Nairobi', -1.29, 36.82), ('Nakuru', -0.30, 36.07), ('Kiambu', -1.17, 36.83),
+    ('Meru', 0.05, 37.65), ('Eldoret', 0.51, 35.27), ('Kisumu', -0.09, 34.77),
+    ('Machakos', -1.52, 37.26), ('Nyeri', -0.42, 36.95), ('Kakamega', 0.28, 34.75),
+    ('Kericho', -0.37, 35.29), ('Embu', -0.54, 37.45), ('Kitale', 1.02, 35.00),
+    ('Bungoma', 0.56, 34.56), ('Narok', -1.08, 35.87), ('Mombasa', -4.04, 39.67),
+]
+
+# (product, category, unit, price in KSh for the smallest pack)
+CATALOG = [
+    ('DAP Fertilizer', 'Fertilizer', 'bag', 3500), ('CAN Fertilizer', 'Fertilizer', 'bag', 2800),
+    ('NPK 17:17:17', 'Fertilizer', 'bag', 3900), ('Urea', 'Fertilizer', 'bag', 3200),
+    ('Foliar Feed', 'Fertilizer', 'litre', 650), ('H614 Maize Seed', 'Seeds', 'kg', 320),
+    ('DK8031 Maize Seed', 'Seeds', 'kg', 380), ('Bean Seed', 'Seeds', 'kg', 240),
+    ('Tomato Seed Anna F1', 'Seeds', 'packet', 1200), ('Sukuma Wiki Seed', 'Seeds', 'packet', 150),
+    ('Mancozeb', 'Fungicide', 'kg', 900), ('Ridomil Gold', 'Fungicide', 'kg', 2100),
+    ('Copper Oxychloride', 'Fungicide', 'kg', 850), ('Duduthrin', 'Pesticide', 'litre', 1100),
+    ('Thunder OD', 'Pesticide', 'litre', 1900), ('Roundup', 'Herbicide', 'litre', 1300),
+    ('Dairy Meal', 'Animal Feed', 'bag', 2600), ('Layers Mash', 'Animal Feed', 'bag', 3100),
+    ('Chick Mash', 'Animal Feed', 'bag', 3300), ('Mineral Lick', 'Animal Feed', 'kg', 180),
+    ('Dewormer', 'Veterinary', 'bottle', 450), ('Tick Grease', 'Veterinary', 'tin', 300),
+    ('Knapsack Sprayer', 'Equipment', 'piece', 4500), ('Wheelbarrow', 'Equipment', 'piece', 6500),
+]
+PACK_SIZES = [1, 2, 5, 10]
+
+DISEASES = [
+    'Maize Lethal Necrosis', 'Fall Armyworm', 'Late Blight', 'Early Blight', 'Bean Rust',
+    'Coffee Berry Disease', 'Cassava Mosaic', 'Powdery Mildew', 'Bacterial Wilt', 'Grey Leaf Spot',
+]
+SYMPTOMS = [
+    'Yellowing leaves with brown spots', 'Holes in leaves and frass in the whorl',
+    'Dark water-soaked lesions on leaves', 'White powder on upper leaf surface',
+    'Wilting despite moist soil', 'Stunted plants with mottled leaves',
+]
+
+PAYMENT_METHODS = (['cash', 'mpesa', 'card'], [0.35, 0.6, 0.05])
+CUSTOMER_TYPES = ['farmer', 'reseller', 'institution', 'individual']
+COMMUNICATION_TYPES = ['call', 'email', 'meeting', 'note']
+REPORT_STATUSES = (['pending', 'reviewed', 'resolved'], [0.5, 0.3, 0.2])
+
+
+def use_database(name, database_url=None):
+    """Point the app at ``database_url``, or else a fresh SQLite file, and work
+    from a new temporary directory (uploads land there). Call before importing
+    the app."""
+    workdir = tempfile.mkdtemp(prefix=f'{name}_')
+    os.environ['DATABASE_URL'] = database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.chdir(workdir)
+    return os.environ['DATABASE_URL']
+
+
+def _money(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def _insert(model, rows, counts):
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+        counts[model.__tablename__] = counts.get(model.__tablename__, 0) + len(rows)
+
+
+def _dates(rng, now, n, days):
+    # Recent days are busier: exponential age, clipped to the history window
+    seconds = np.minimum(rng.exponential(days * 86400 / 3, n), days * 86400 - 1).astype(np.int64)
+    return [now - timedelta(seconds=int(s)) for s in seconds]
+
+
+class Layout:
+    """Id ranges for every generated row, so rows can reference each other
+    without reading anything back."""
+
+    def __init__(self, scale):
+        self.__dict__.update(scale)
+        self.agrovet_ids = np.arange(1, self.agrovets + 1)
+        self.farmer_ids = np.arange(self.agrovets + 1, self.agrovets + self.farmers + 1)
+        self.officer_ids = np.arange(self.farmer_ids[-1] + 1, self.farmer_ids[-1] + self.officers + 1)
+        self.institution_ids = np.arange(self.officer_ids[-1] + 1, self.officer_ids[-1] + self.institutions + 1)
+        self.user_count = int(self.institution_ids[-1])
+
+    def inventory_id(self, agrovet, product):
+        return agrovet * self.products_per_agrovet + product + 1
+
+    def customer_id(self, agrovet, customer):
+        return agrovet * self.customers_per_agrovet + customer + 1
+
+
+def _users(layout, now, counts, rng):
+    account_hash = hash_password(PASSWORD)
+    roles = [
+        ('agrovet', layout.agrovet_ids, 'Agrovet'),
+        ('farmer', layout.farmer_ids, 'Farmer'),
+        ('extension_officer', layout.officer_ids, 'Officer'),
+        ('learning_institution', layout.institution_ids, 'Institution'),
+    ]
+    for user_type, ids, label in roles:
+        for first in range(0, len(ids), CHUNK):
+            chunk = ids[first:first + CHUNK]
+            county = rng.integers(len(COUNTIES), size=len(chunk))
+            jitter = rng.normal(0, 0.15, size=(len(chunk), 2))
+            rows = []
+            for n, (user_id, c, (dlat, dlon)) in enumerate(zip(chunk.tolist(), county, jitter), first):
+                account = n == 0
+                name, lat, lon = COUNTIES[c]
+                rows.append({
+                    'id': user_id,
+                    # Directory accounts never log in, so skip the deliberately slow hashing
+                    'email': ACCOUNTS[user_type] if account else f'{user_type}{n}@bench.test',
+                    'password_hash': account_hash if account else '!',
+                    'full_name': f'Bench {label}' if account else f'{label} {n}',
+                    'user_type': user_type,
+                    'phone_number': f'07{user_id % 100000000:08d}',
+                    'location': name,
+                    'latitude': round(float(lat + dlat), 5),
+                    'longitude': round(float(lon + dlon), 5),
+                    'created_at': now - timedelta(days=HISTORY_DAYS + 30),
+                    'is_active': True,
+                })
+            _insert(User, rows, counts)
+            db.session.commit()
+
+
+def _inventory(layout, now, counts, rng):
+    """Returns (price, cost) in cents and the catalog variant per agrovet/product slot."""
+    shape = (layout.agrovets, layout.products_per_agrovet)
+    variants = len(CATALOG) * len(PACK_SIZES)
+    variant = np.argsort(rng.random((layout.agrovets, variants)), axis=1)[:, :layout.products_per_agrovet]
+    base = np.array([price for _, _, _, price in CATALOG], dtype=np.int64)[variant // len(PACK_SIZES)]
+    size = np.array(PACK_SIZES)[variant % len(PACK_SIZES)]
+    # Bigger packs are cheaper per unit; each shop prices within +-10%
+    price = (base * size * (1 - 0.04 * np.log2(size)) * rng.uniform(0.9, 1.1, shape) * 100).round(-2).astype(np.int64)
+    cost = (price * rng.uniform(0.7, 0.85, shape)).round().astype(np.int64)
+    stock = rng.integers(0, 500, shape)
+    # Keep the benchmark shop in stock so checkout scenarios never conflict
+    stock[0] += 100000
+
+    per_chunk = max(1, CHUNK // layout.products_per_agrovet)
+    for first in range(0, layout.agrovets, per_chunk):
+        rows = []
+        for a in range(first, min(first + per_chunk, layout.agrovets)):
+            for k in range(layout.products_per_agrovet):
+                product, category, unit, _ = CATALOG[variant[a, k] // len(PACK_SIZES)]
+                pack = PACK_SIZES[variant[a, k] % len(PACK_SIZES)]
+                rows.append({
+                    'id': layout.inventory_id(a, k),
+                    'agrovet_id': int(layout.agrovet_ids[a]),
+                    'product_name': f'{product} {pack} {unit}',
+                    'category': category,
+                    'quantity': int(stock[a, k]),
+                    'unit': unit,
+                    'price': _money(price[a, k]),
+                    'cost_price': _money(cost[a, k]),
+                    'reorder_level': 10,
+                    'sku': f'SKU{a:05d}{k:03d}',
+                    'created_at': now - timedelta(days=HISTORY_DAYS),
+                    'updated_at': now - timedelta(days=1),
+                })
+        _insert(InventoryItem, rows, counts)
+        db.session.commit()
+    return price, cost, variant
+
+
+def _customers(layout, now, counts, rng):
+    total = layout.agrovets * layout.customers_per_agrovet
+    for first in range(0, total, CHUNK):
+        n = min(CHUNK, total - first)
+        spent = rng.lognormal(9, 1.2, n).round(2)
+        kind = rng.integers(len(CUSTOMER_TYPES), size=n)
+        last = _dates(rng, now, n, 90)
+        rows = [{
+            'id': first + i + 1,
+            'agrovet_id': int(layout.agrovet_ids[(first + i) // layout.customers_per_agrovet]),
+            'name': f'Customer {first + i}',
+            'phone': f'07{(first + i) % 100000000:08d}',
+            'email': f'customer{first + i}@bench.test',
+            'customer_type': CUSTOMER_TYPES[kind[i]],
+            'created_at': now - timedelta(days=HISTORY_DAYS),
+            'total_purchases': Decimal(str(spent[i])),
+            'last_purchase': last[i],
+        } for i in range(n)]
+        _insert(Customer, rows, counts)
+        db.session.commit()
+
+
+def _sales(layout, now, counts, rng, price, cost, variant):
+    # Pareto-distributed shop sizes; the benchmark shop is the busiest
+    weights = rng.pareto(1.2, layout.agrovets) + 1
+    weights[0] = weights.max() * 1.5
+    weights /= weights.sum()
+    method_names, method_weights = PAYMENT_METHODS
+
+    sale_id = item_id = 1
+    remaining = layout.sale_items
+    while remaining > 0:
+        n = max(1, min(CHUNK // 3, remaining // 3))
+        shop = rng.choice(layout.agrovets, size=n, p=weights)
+        lines = np.minimum(rng.integers(1, 6, n), remaining)
+        remaining -= int(lines.sum())
+        has_customer = rng.random(n) < 0.6
+        customer = rng.integers(layout.customers_per_agrovet, size=n)
+        method = rng.choice(len(method_names), size=n, p=method_weights)
+        dates = _dates(rng, now, n, HISTORY_DAYS)
+
+        line_shop = np.repeat(shop, lines)
+        slot = rng.integers(layout.products_per_agrovet, size=len(line_shop))
+        quantity = rng.geometric(0.45, len(line_shop))
+        unit_price = price[line_shop, slot]
+        unit_cost = cost[line_shop, slot]
+        subtotal = unit_price * quantity
+        totals = np.bincount(np.repeat(np.arange(n), lines), weights=subtotal, minlength=n).astype(np.int64)
+
+        sales = [{
+            'id': sale_id + i,
+            'agrovet_id': int(layout.agrovet_ids[shop[i]]),
+            'customer_id': layout.customer_id(int(shop[i]), int(customer[i])) if has_customer[i] else None,
+            'sale_date': dates[i],
+            'total_amount': _money(totals[i]),
+            'payment_method': method_names[method[i]],
+            'status': 'completed',
+            'receipt_number': f'SYN{sale_id + i}',
+        } for i in range(n)]
+        line_sale = np.repeat(np.arange(sale_id, sale_id + n), lines)
+        items = []
+        for j in range(len(line_shop)):
+            product, _, unit, _ = CATALOG[variant[line_shop[j], slot[j]] // len(PACK_SIZES)]
+            pack = PACK_SIZES[variant[line_shop[j], slot[j]] % len(PACK_SIZES)]
+            items.append({
+                'id': item_id + j,
+                'sale_id': int(line_sale[j]),
+                'agrovet_id': int(layout.agrovet_ids[line_shop[j]]),
+                'product_name': f'{product} {pack} {unit}',
+                'quantity': int(quantity[j]),
+                'unit_price': _money(unit_price[j]),
+                'unit_cost': _money(unit_cost[j]),
+                'subtotal': _money(subtotal[j]),
+            })
+        _insert(Sale, sales, counts)
+        _insert(SaleItem, items, counts)
+        db.session.commit()
+        sale_id += n
+        item_id += len(items)
+
+
+def _communications(layout, now, counts, rng):
+    customers = layout.agrovets * layout.customers_per_agrovet
+    for first in range(0, layout.communications, CHUNK):
+        n = min(CHUNK, layout.communications - first)
+        # The benchmark shop's customers get a share, so its CRM pages have history
+        customer = np.where(rng.random(n) < 0.1, rng.integers(layout.customers_per_agrovet, size=n),
+                            rng.integers(customers, size=n))
+        kind = rng.integers(len(COMMUNICATION_TYPES), size=n)
+        dates = _dates(rng, now, n, HISTORY_DAYS)
+        rows = [{
+            'id': first + i + 1,
+            'customer_id': int(customer[i]) + 1,
+            'communication_type': COMMUNICATION_TYPES[kind[i]],
+            'subject': 'Follow up on order',
+            'message': 'Discussed upcoming planting season needs.',
+            'date': dates[i],
+            'follow_up_date': dates[i] + timedelta(days=14) if i % 3 == 0 else None,
+            'status': 'pending' if i % 4 == 0 else 'completed',
+        } for i in range(n)]
+        _insert(Communication, rows, counts)
+        db.session.commit()
+
+
+def _disease_reports(layout, now, counts, rng):
+    status_names, status_weights = REPORT_STATUSES
+    for first in range(0, layout.disease_reports, CHUNK):
+        n = min(CHUNK, layout.disease_reports - first)
+        farmer = rng.integers(layout.farmers, size=n)
+        county = rng.integers(len(COUNTIES), size=n)
+        disease = rng.integers(len(DISEASES), size=n)
+        symptom = rng.integers(len(SYMPTOMS), size=n)
+        status = rng.choice(len(status_names), size=n, p=status_weights)
+        confidence = rng.uniform(0.4, 0.99, n).round(2)
+        dates = _dates(rng, now, n, 180)
+        rows = []
+        for i in range(n):
+            diagnosed = status_names[status[i]] != 'pending'
+            name, lat, lon = COUNTIES[county[i]]
+            rows.append({
+                'id': first + i + 1,
+                'farmer_id': int(layout.farmer_ids[farmer[i]]),
+                'plant_description': SYMPTOMS[symptom[i]],
+                'disease_detected': DISEASES[disease[i]] if diagnosed else None,
+                'confidence': float(confidence[i]) if diagnosed else None,
+                'treatment_recommendation': 'Remove affected plants and apply a recommended fungicide.',
+                'location': name,
+                'latitude': lat,
+                'longitude': lon,
+                'status': status_names[status[i]],
+                'created_at': dates[i],
+            })
+        _insert(DiseaseReport, rows, counts)
+        db.session.commit()
+
+
+def _notifications(layout, now, counts, rng):
+    for first in range(0, layout.notifications, CHUNK):
+        n = min(CHUNK, layout.notifications - first)
+        # Every benchmark account has a few unread notifications in its header
+        user = np.where(rng.random(n) < 0.02,
+                        rng.choice([layout.agrovet_ids[0], layout.farmer_ids[0], layout.officer_ids[0],
+                                    layout.institution_ids[0]], size=n),
+                        rng.integers(1, layout.user_count + 1, size=n))
+        dates = _dates(rng, now, n, 60)
+        rows = [{
+            'id': first + i + 1,
+            'user_id': int(user[i]),
+            'title': 'Disease alert in your area',
+            'message': 'Cases of Fall Armyworm have been reported near you.',
+            'notification_type': 'alert',
+            'is_read': bool(i % 3),
+            'created_at': dates[i],
+        } for i in range(n)]
+        _insert(Notification, rows, counts)
+        db.session.commit()
+
+
+def _weather(layout, now, counts, rng):
+    rows = [{
+        'location': name,
+        'temperature': round(float(rng.uniform(14, 32)), 1),
+        'humidity': round(float(rng.uniform(40, 95)), 1),
+        'description': 'scattered clouds',
+        'recommendations': 'Good conditions for top dressing.',
+        'forecast_date': now + timedelta(days=day),
+        'created_at': now,
+    } for name, _, _ in COUNTIES for day in range(7)]
+    _insert(WeatherData, rows, counts)
+    db.session.commit()
+
+
+def _reset_sequences():
+    # Rows were inserted with explicit ids; move Postgres sequences past them
+    for model in (User, InventoryItem, Customer, Sale, SaleItem, Communication, DiseaseReport,
+                  Notification, WeatherData):
+        table = model.__tablename__
+        db.session.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"))
+    db.session.commit()
+
+
+def generate(scale='tiny', seed=42, progress=print, **counts):
+    """Fill an empty database with ``scale`` data. Returns rows written per table.
+
+    Keyword arguments override single counts of the scale, e.g.
+    ``disease_reports=200000``. Needs an app context.
+    """
+    if db.session.query(func.count(User.id)).scalar():
+        raise RuntimeError('datagen needs an empty database')
+    unknown = set(counts) - set(SCALES[scale])
+    if unknown:
+        raise TypeError(f"unknown datagen counts: {', '.join(sorted(unknown))}")
+
+    layout = Layout(dict(SCALES[scale], **counts))
+    rng = np.random.default_rng(seed)
+    # Dates are relative to the start of today so "today" pages have data
+    now = datetime.combine(datetime.utcnow().date(), datetime.min.time()) + timedelta(hours=8)
+    written = {}
+
+    def step(name, fill, *args):
+        started = time.perf_counter()
+        result = fill(layout, now, written, rng, *args)
+        if progress:
+            progress(f'  {name:<16}{time.perf_counter() - started:>8.1f}s')
+        return result
+
+    step('users', _users)
+    inventory = step('inventory', _inventory)
+    step('customers', _customers)
+    step('sales', _sales, *inventory)
+    step('communications', _communications)
+    step('disease reports', _disease_reports)
+    step('notifications', _notifications)
+    step('weather', _weather)
+
+    if db.engine.dialect.name == 'postgresql':
+        _reset_sequences()
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='defaults to DATABASE_URL / config.py')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    from app import app
+
+    with app.app_context():
+        counts = generate(args.scale, args.seed)
+    for table, count in counts.items():
+        print(f'{table:<18}{count:>12,}')
+
+
+if __name__ == '__main__':
+    main()
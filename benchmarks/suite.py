@@ -0,0 +1,340 @@
+# benchmarks/suite.py
+"""End-to-end benchmark of every role's routes, checked against a baseline.
+
+Seeds a throwaway SQLite database with datagen.py (or uses --database-url, which
+is seeded only if empty), logs in as each role and drives its routes through
+the Flask test client with Cohere and OpenWeather mocked out. Per scenario it
+records median and p95 latency, SQL statements per request and peak Python
+memory allocated while handling one request (tracemalloc, measured in a
+separate pass because tracing slows everything down).
+
+Results are compared with baseline.json for the same scale and database. The
+run fails (exit status 1) when a scenario issues more queries than its
+baseline, or when a GET page is not smaller gzip/brotli-compressed than plain
+or does not answer a matching If-None-Match with 304 (see wire_problems).
+Latency or memory growth beyond --tolerance is reported as a warning, since
+millisecond timings vary between runs of the same tree; --strict fails on it
+too. Latency baselines are machine-specific: refresh them with
+--update-baseline on the machine that runs the comparison, and commit the file
+with the change that moved them.
+
+    python benchmarks/suite.py [--scale tiny] [--repeat 30] [--only agrovet]
+    python benchmarks/suite.py --strict --repeat 200
+    python benchmarks/suite.py --update-baseline
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+# Regressions smaller than these are noise whatever the tolerance says
+MIN_LATENCY_REGRESSION_MS = 1.0
+MIN_MEMORY_REGRESSION_KB = 64
+
+PNG = (b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f'
+       b'\x15\xc4\x89\x00\x00\x00\rIDATx\x9cc\xf8\xcf\xc0\x00\x00\x03\x01\x01\x00\xc9\xfe\x92\xef'
+       b'\x00\x00\x00\x00IEND\xaeB`\x82')
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+
+def fake_post(url, **kwargs):
+    if 'cohere' in url:
+        return FakeResponse({'text': 'Likely early blight. Remove affected leaves and apply a copper fungicide.'})
+    raise AssertionError(f'unexpected POST {url}')
+
+
+def fake_get(url, **kwargs):
+    conditions = {'main': {'temp': 24.5, 'feels_like': 25.0, 'humidity': 65},
+                  'weather': [{'description': 'scattered clouds', 'icon': '03d'}]}
+    if 'openweathermap.org/data/2.5/weather' in url:
+        return FakeResponse(dict(conditions, name='Nakuru', wind={'speed': 3.1}))
+    if 'openweathermap.org/data/2.5/forecast' in url:
+        return FakeResponse({'list': [dict(conditions, dt_txt=f'2025-01-0{day} 12:00:00') for day in range(1, 6)]})
+    if 'cohere' in url:
+        return FakeResponse({'models': [{'name': 'c4ai-aya-expanse-8b'}]})
+    raise AssertionError(f'unexpected GET {url}')
+
+
+def _checkout(n):
+    return {'json': {'items': [{'id': 1, 'quantity': 1}, {'id': 2, 'quantity': 2}], 'payment_method': 'mpesa'}}
+
+
+def _sync(n):
+    return {'json': {'sales': [{'client_uuid': str(uuid.uuid4()), 'items': [{'id': 3, 'quantity': 1}],
+                                'payment_method': 'cash'} for _ in range(20)]}}
+
+
+def _detect(n):
+    return {'data': {'description': 'Brown spots on tomato leaves',
+                     'plant_image': (io.BytesIO(PNG), 'leaf.png')},
+            'content_type': 'multipart/form-data'}
+
+
+def _chat(n):
+    return {'json': {'message': 'When should I top dress maize?'}}
+
+
+def _triage(n):
+    # Alternates so every iteration changes the reports and notifies their farmers
+    return {'json': {'status': 'resolved' if n % 2 else 'reviewed', 'disease_detected': 'Late Blight',
+                     'confidence': 0.9, 'reports': [{'id': report_id} for report_id in range(1, 201)]}}
+
+
+# (name, role, method, path, request kwargs for iteration n)
+SCENARIOS = [
+    ('farmer.dashboard', 'farmer', 'GET', '/farmer/dashboard', None),
+    ('farmer.agrovets', 'farmer', 'GET', '/farmer/agrovets', None),
+    ('farmer.weather', 'farmer', 'GET', '/farmer/weather', None),
+    ('farmer.detect_disease', 'farmer', 'POST', '/farmer/detect-disease', _detect),
+    ('farmer.chat', 'farmer', 'POST', '/api/chat', _chat),
+    ('agrovet.dashboard', 'agrovet', 'GET', '/agrovet/dashboard', None),
+    ('agrovet.inventory', 'agrovet', 'GET', '/agrovet/inventory', None),
+    ('agrovet.pos', 'agrovet', 'GET', '/agrovet/pos', None),
+    ('agrovet.pos_checkout', 'agrovet', 'POST', '/agrovet/pos/checkout', _checkout),
+    ('agrovet.pos_sync', 'agrovet', 'POST', '/agrovet/pos/sync', _sync),
+    ('agrovet.reports_summary', 'agrovet', 'GET', '/agrovet/reports/summary?period=week&days=90', None),
+    ('agrovet.crm', 'agrovet', 'GET', '/agrovet/crm', None),
+    ('agrovet.view_customer', 'agrovet', 'GET', '/agrovet/crm/view/1', None),
+    ('officer.dashboard', 'extension_officer', 'GET', '/officer/dashboard', None),
+    ('officer.reports', 'extension_officer', 'GET', '/officer/reports?status=pending&since=2020-01-01', None),
+    ('officer.triage', 'extension_officer', 'POST', '/officer/reports/triage', _triage),
+    ('institution.dashboard', 'learning_institution', 'GET', '/institution/dashboard', None),
+]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Runner:
+    def __init__(self, app, db, accounts, password):
+        self.app = app
+        self.db = db
+        self.clients = {}
+        self.accounts = accounts
+        self.password = password
+        self.queries = 0
+
+    def client(self, role):
+        client = self.clients.get(role)
+        if client is None:
+            client = self.clients[role] = self.app.test_client()
+            response = client.post('/login', data={'email': self.accounts[role], 'password': self.password})
+            assert response.status_code == 302, f'login as {role} failed ({response.status_code})'
+            client.get('/', follow_redirects=True)  # render the dashboard, consuming the login flash
+        return client
+
+    def _count(self, *args):
+        self.queries += 1
+
+    def request(self, scenario, n):
+        name, role, method, path, body = scenario
+        client = self.client(role)
+        kwargs = body(n) if body else {}
+        self.queries = 0
+        start = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        assert response.status_code == 200, f'{name}: {method} {path} -> {response.status_code}'
+        return elapsed, self.queries
+
+    def run(self, scenario, repeat, memory_repeat, warmup=2):
+        from sqlalchemy import event
+
+        for n in range(warmup):
+            self.request(scenario, n)
+
+        timings, queries = [], []
+        with self.app.app_context():
+            engine = self.db.engine
+        event.listen(engine, 'before_cursor_execute', self._count)
+        try:
+            for n in range(repeat):
+                elapsed, count = self.request(scenario, n)
+                timings.append(elapsed)
+                queries.append(count)
+        finally:
+            event.remove(engine, 'before_cursor_execute', self._count)
+
+        peaks = []
+        tracemalloc.start()
+        try:
+            for n in range(memory_repeat):
+                tracemalloc.clear_traces()
+                baseline, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                self.request(scenario, n)
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'queries': statistics.median_low(queries),
+            'peak_kb': round(statistics.median(peaks) / 1024),
+        }
+
+
+def wire_problems(client, path, encodings, min_size, require_etag=False):
+    """Compression and revalidation problems for a GET of ``path``, empty if none.
+
+    Every encoding in ``encodings`` must come back smaller than the plain body
+    once that is at least ``min_size`` bytes, and a page sent with an ETag must
+    answer a matching If-None-Match with an empty 304.
+    """
+    problems = []
+    plain = client.get(path, headers={'Accept-Encoding': 'identity'})
+    if len(plain.data) >= min_size:
+        for encoding in encodings:
+            response = client.get(path, headers={'Accept-Encoding': encoding})
+            if response.headers.get('Content-Encoding') != encoding or len(response.data) >= len(plain.data):
+                problems.append(f'{encoding} body {len(response.data)}B, plain {len(plain.data)}B')
+
+    etag = plain.headers.get('ETag')
+    if etag:
+        revalidated = client.get(path, headers={'If-None-Match': etag, 'Accept-Encoding': ', '.join(encodings)})
+        if revalidated.status_code != 304 or revalidated.data:
+            problems.append(f'If-None-Match -> {revalidated.status_code} ({len(revalidated.data)}B)')
+    elif require_etag:
+        problems.append('no ETag')
+    return problems
+
+
+def compare(result, baseline, tolerance):
+    """Query-count regressions and latency/memory growth for one scenario, as
+    two lists of messages, both empty if it is within bounds."""
+    regressions, growth = [], []
+    if result['queries'] > baseline['queries']:
+        regressions.append(f"queries {baseline['queries']} -> {result['queries']}")
+    limit = baseline['p50_ms'] * (1 + tolerance)
+    if result['p50_ms'] > limit and result['p50_ms'] - baseline['p50_ms'] >= MIN_LATENCY_REGRESSION_MS:
+        growth.append(f"p50 {baseline['p50_ms']}ms -> {result['p50_ms']}ms")
+    limit = baseline['peak_kb'] * (1 + tolerance)
+    if result['peak_kb'] > limit and result['peak_kb'] - baseline['peak_kb'] >= MIN_MEMORY_REGRESSION_KB:
+        growth.append(f"memory {baseline['peak_kb']}KB -> {result['peak_kb']}KB")
+    return regressions, growth
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='tiny', help='datagen scale (default tiny)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='benchmark this database instead of a fresh SQLite file')
+    parser.add_argument('--repeat', type=int, default=30, help='timed requests per scenario')
+    parser.add_argument('--memory-repeat', type=int, default=3, help='traced requests per scenario')
+    parser.add_argument('--only', help='run scenarios whose name contains this')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed relative growth in latency and memory (default 0.5 = +50%%)')
+    parser.add_argument('--strict', action='store_true',
+                        help='fail on latency and memory growth too, not just warn (use a high --repeat)')
+    parser.add_argument('--fragment-cache', action='store_true',
+                        help='keep {% cache %} blocks on (default off, so every request renders)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store these results as the baseline for this scale')
+    args = parser.parse_args()
+
+    import datagen
+    datagen.use_database('bench_suite', args.database_url)
+
+    import http_cache
+    from app import app
+    from models import db, User
+
+    app.config['FRAGMENT_CACHE_ENABLED'] = args.fragment_cache
+
+    with app.app_context():
+        if db.session.query(User.id).first() is None:
+            print(f'Generating {args.scale} data set...')
+            datagen.generate(args.scale, args.seed)
+        # SQLite and Postgres timings are not comparable, so each has its own baseline
+        baseline_key = f'{args.scale}-{db.engine.dialect.name}'
+
+    encodings = ['gzip', 'br'] if http_cache.brotli is not None else ['gzip']
+    scenarios = [s for s in SCENARIOS if not args.only or args.only in s[0]]
+    runner = Runner(app, db, datagen.ACCOUNTS, datagen.PASSWORD)
+    baselines = load_baseline().get(baseline_key, {})
+    results = {}
+    failures = []
+    warnings = []
+
+    print(f"{'scenario':<28}{'p50 ms':>9}{'p95 ms':>9}{'queries':>9}{'peak KB':>9}  vs baseline")
+    with mock.patch('requests.post', side_effect=fake_post), mock.patch('requests.get', side_effect=fake_get):
+        for scenario in scenarios:
+            name = scenario[0]
+            result = results[name] = runner.run(scenario, args.repeat, args.memory_repeat)
+            baseline = baselines.get(name)
+            if baseline is None:
+                verdict = 'new'
+            else:
+                regressions, growth = compare(result, baseline, args.tolerance)
+                if args.strict:
+                    regressions, growth = regressions + growth, []
+                failures += [f'{name}: {problem}' for problem in regressions]
+                warnings += [f'{name}: {problem}' for problem in growth]
+                verdicts = []
+                if regressions:
+                    verdicts.append('REGRESSION ' + ', '.join(regressions))
+                if growth:
+                    verdicts.append('warning ' + ', '.join(growth))
+                verdict = '; '.join(verdicts) or 'ok'
+            if scenario[2] == 'GET':
+                wire = wire_problems(runner.client(scenario[1]), scenario[3], encodings,
+                                     app.config['COMPRESS_MIN_SIZE'])
+                failures += [f'{name}: {problem}' for problem in wire]
+                if wire:
+                    verdict += ', WIRE ' + ', '.join(wire)
+            print(f"{name:<28}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['queries']:>9}"
+                  f"{result['peak_kb']:>9}  {verdict}")
+
+    if args.update_baseline:
+        stored = load_baseline()
+        stored.setdefault(baseline_key, {}).update(results)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline for {baseline_key} written to {BASELINE_PATH}')
+        return 0
+
+    if warnings:
+        print(f'\n{len(warnings)} warning(s), latency/memory beyond --tolerance (fatal with --strict):')
+        for warning in warnings:
+            print(f'  {warning}')
+    if failures:
+        print(f'\n{len(failures)} regression(s):')
+        for failure in failures:
+            print(f'  {failure}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
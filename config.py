@@ -1,5 +1,6 @@
 # config.py
 import os
+import tempfile
 
 class Config:
     # Security
@@ -13,6 +14,59 @@ class Config:
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Password hashing (existing hashes are upgraded on the next successful login)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', '16'))
+    # Password verifications running at once across all workers on the host (keep
+    # below the gunicorn worker count), seconds a login waits for one, and where
+    # the shared slot lock files live
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '1'))
+    PASSWORD_HASH_WAIT = float(os.environ.get('PASSWORD_HASH_WAIT', '1'))
+    PASSWORD_HASH_LOCK_DIR = os.environ.get(
+        'PASSWORD_HASH_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'benpharm_password_slots'))
+    
+    # Login attempts: burst size and sustained rate per client IP and per email
+    LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', '10'))
+    LOGIN_IP_PER_MINUTE = float(os.environ.get('LOGIN_IP_PER_MINUTE', '10'))
+    LOGIN_EMAIL_BURST = int(os.environ.get('LOGIN_EMAIL_BURST', '5'))
+    LOGIN_EMAIL_PER_MINUTE = float(os.environ.get('LOGIN_EMAIL_PER_MINUTE', '3'))
+    # Proxies in front of the app that append to X-Forwarded-For (1 on Render);
+    # the client IP is read from the hop the nearest of them added. Leave at 0
+    # when clients connect directly, or they could forge their address.
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '0'))
+    
+    # Seconds a logged-in user's identity/role snapshot is reused between requests
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', '60'))
+    # ...and how often each worker checks whether a user was changed (e.g. deactivated) elsewhere
+    USER_CACHE_CHECK_SECONDS = float(os.environ.get('USER_CACHE_CHECK_SECONDS', '5'))
+    
+    # Rendered {% cache %} fragments: seconds kept and entries per worker
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', 'True').lower() == 'true'
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', '300'))
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', '2048'))
+    
+    # Compress HTML/JSON responses at least this many bytes long
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', '6'))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', '5'))
+    
+    # Largest number of offline POS sales accepted in one sync request
+    POS_SYNC_MAX_BATCH = int(os.environ.get('POS_SYNC_MAX_BATCH', '200'))
+    
+    # Longest look-back, in days, of the agrovet sales summary
+    SUMMARY_MAX_DAYS = int(os.environ.get('SUMMARY_MAX_DAYS', '3660'))
+    
+    # Postgres partitioning (python partitioning.py): hash partitions per tenant table,
+    # monthly sales partitions kept ready ahead of time, and where archived months go
+    TENANT_HASH_PARTITIONS = int(os.environ.get('TENANT_HASH_PARTITIONS', '16'))
+    SALES_PARTITION_MONTHS_AHEAD = int(os.environ.get('SALES_PARTITION_MONTHS_AHEAD', '3'))
+    ARCHIVE_SCHEMA = os.environ.get('ARCHIVE_SCHEMA', 'archive')
+    
+    # Disease report triage API: reports per listed page, and per triage request
+    TRIAGE_PAGE_SIZE = int(os.environ.get('TRIAGE_PAGE_SIZE', '100'))
+    TRIAGE_MAX_PAGE_SIZE = int(os.environ.get('TRIAGE_MAX_PAGE_SIZE', '500'))
+    TRIAGE_MAX_BATCH = int(os.environ.get('TRIAGE_MAX_BATCH', '1000'))
+    
     # Upload settings
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
@@ -21,5 +75,17 @@ class Config:
     COHERE_API_KEY = os.environ.get('COHERE_API_KEY', '')
     OPENWEATHER_API_KEY = os.environ.get('OPENWEATHER_API_KEY', '')
     
+    # Monitoring
+    # Requests slower than this are logged with their slowest SQL (0 disables)
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '0'))
+    # /metrics is served only when this is set, to scrapers that send it as
+    # "Authorization: Bearer <token>"
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    
     # Debug
-    DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
\ No newline at end of file
+    DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
+
+config = {
+    'development': Config,
+    'production': Config,
+}
@@ -0,0 +1,158 @@
+# fragment_cache.py
+"""Caching of rendered template fragments.
+
+In a template::
+
+    {% cache 'recent_sales', current_user.id, data_version('sales', current_user.id) %}
+        ...expensive markup...
+    {% endcache %}
+
+The arguments form the cache key, so a fragment is keyed by whatever it
+depends on: tenant, role and the version of the data it shows. Write routes
+call bump_version() in the same transaction as the write; the version lives in
+the database, so every worker sees the new key immediately and old entries
+simply age out. Rendered fragments are held per worker process.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app, g
+from jinja2 import nodes
+from jinja2.ext import Extension
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import metrics
+from models import db, DataVersion
+
+UPSERT_INSERTS = {'postgresql': postgresql_insert, 'sqlite': sqlite_insert}
+
+
+def _version_row(scope, tenant_id):
+    versions = g.setdefault('data_versions', {})
+    key = (scope, tenant_id)
+    if key not in versions:
+        table = DataVersion.__table__
+        row = db.session.execute(
+            select(table.c.version, table.c.updated_at)
+            .where(table.c.scope == scope, table.c.tenant_id == tenant_id)
+        ).first()
+        versions[key] = tuple(row) if row else (0, None)
+    return versions[key]
+
+
+def data_version(scope, tenant_id=0):
+    """Current version of ``scope`` for ``tenant_id``; 0 if never bumped."""
+    return _version_row(scope, tenant_id)[0]
+
+
+def data_updated_at(scope, tenant_id=0):
+    """When ``scope`` was last bumped for ``tenant_id``, or None."""
+    return _version_row(scope, tenant_id)[1]
+
+
+def bump_version(scope, tenant_id=0):
+    """Invalidate everything keyed on ``scope``; commits with the caller's transaction."""
+    bump_versions(scope, [tenant_id])
+
+
+def bump_versions(scope, tenant_ids, connection=None):
+    """bump_version() for many tenants, in one statement where the database has upserts.
+
+    Mapper event handlers run mid-flush and pass their ``connection``, which
+    is used instead of the session.
+    """
+    table = DataVersion.__table__
+    now = datetime.utcnow()
+    executor = connection if connection is not None else db.session
+    bind = connection if connection is not None else db.session.get_bind()
+    insert = UPSERT_INSERTS.get(bind.dialect.name)
+    # Deduplicated (an upsert may not touch a row twice) and sorted, so
+    # concurrent bumps lock rows in the same order
+    tenant_ids = sorted(set(tenant_ids))
+    if not tenant_ids:
+        return
+
+    if insert is not None:
+        stmt = insert(table).values([{'scope': scope, 'tenant_id': tenant_id, 'version': 1, 'updated_at': now}
+                                     for tenant_id in tenant_ids])
+        executor.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.scope, table.c.tenant_id],
+            set_={'version': table.c.version + 1, 'updated_at': now}))
+    else:
+        for tenant_id in tenant_ids:
+            result = executor.execute(
+                update(table).where(table.c.scope == scope, table.c.tenant_id == tenant_id)
+                .values(version=table.c.version + 1, updated_at=now))
+            if result.rowcount == 0:
+                executor.execute(table.insert().values(scope=scope, tenant_id=tenant_id,
+                                                       version=1, updated_at=now))
+
+    g.pop('data_versions', None)
+
+
+class FragmentStore:
+    """Thread-safe LRU of rendered markup with a per-entry TTL."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl, max_entries):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+store = FragmentStore()
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(parts)]),
+                               [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, caller):
+        config = current_app.config
+        if not config['FRAGMENT_CACHE_ENABLED']:
+            return caller()
+
+        key = '\x1f'.join(str(part) for part in parts)
+        cached = store.get(key)
+        metrics.record_cache('fragment', cached is not None)
+        if cached is None:
+            cached = caller()
+            store.set(key, cached, config['FRAGMENT_CACHE_TTL'], config['FRAGMENT_CACHE_SIZE'])
+        return cached
+
+
+def init_app(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.globals['data_version'] = data_version
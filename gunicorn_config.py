@@ -1,5 +1,13 @@
 import multiprocessing
 import os
+import shutil
+import tempfile
+
+# Prometheus multiprocess mode: every worker writes its metrics here and
+# /metrics aggregates them. Must be set before the app (and prometheus_client)
+# is imported in the workers.
+prometheus_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "benpharm_metrics"))
 
 # Server socket
 bind = "0.0.0.0:" + os.environ.get("PORT", "10000")
@@ -29,6 +37,15 @@ group = None
 tmp_upload_dir = None
 
 # Server hooks
+def on_starting(server):
+    # Samples left over from a previous master would be summed into the new ones
+    shutil.rmtree(prometheus_dir, ignore_errors=True)
+    os.makedirs(prometheus_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
 def post_fork(server, worker):
     server.log.info("Worker spawned (pid: %s)", worker.pid)
 
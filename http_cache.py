@@ -0,0 +1,119 @@
+# http_cache.py
+"""Response compression and conditional GET for HTML/JSON routes.
+
+Responses above COMPRESS_MIN_SIZE are brotli- or gzip-compressed, whichever
+the client prefers. Views decorated with @conditional get a weak ETag derived
+from the data versions they depend on (see fragment_cache.bump_version), so a
+revalidation is answered 304 before the view queries or renders anything.
+"""
+import gzip
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from fragment_cache import data_updated_at, data_version
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/javascript', 'application/javascript',
+    'application/json', 'image/svg+xml',
+}
+
+
+def _compress(response):
+    config = current_app.config
+    if (response.direct_passthrough
+            or response.status_code < 200 or response.status_code >= 300
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < config['COMPRESS_MIN_SIZE']:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br'] and accepted['br'] >= accepted['gzip']:
+        body, encoding = brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY']), 'br'
+    elif accepted['gzip']:
+        body, encoding = gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL']), 'gzip'
+    else:
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def _site_digest(app):
+    """Changes whenever a deploy changes templates or asset fingerprints."""
+    digest = hashlib.sha1()
+    for root, _, files in sorted(os.walk(os.path.join(app.root_path, app.template_folder))):
+        for name in sorted(files):
+            with open(os.path.join(root, name), 'rb') as f:
+                digest.update(name.encode() + f.read())
+    for source, hashed in sorted(app.extensions.get('asset_manifest', {}).items()):
+        digest.update(f'{source}={hashed}'.encode())
+    return digest.hexdigest()[:12]
+
+
+def conditional(*scopes, per_user=False, daily=False):
+    """Answer 304 for a GET whose data versions have not changed.
+
+    ``scopes`` are fragment_cache data-version scopes the page renders; with
+    ``per_user`` they are the current user's (tenant) versions rather than the
+    platform-wide ones. ``daily`` adds the date for pages showing "today" totals.
+    Use below @login_required and @role_required.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            # Pending flash messages are part of the page, so render it
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            tenant_id = current_user.id if per_user else 0
+            keys = [(scope, tenant_id) for scope in scopes]
+            # Every page shows the user's name, picture and unread notifications in the header
+            keys += [('users', current_user.id), ('notifications', current_user.id)]
+
+            parts = [current_app.extensions['site_digest'], request.full_path, str(current_user.id)]
+            parts += [f'{scope}:{tenant}:{data_version(scope, tenant)}' for scope, tenant in keys]
+            if daily:
+                parts.append(datetime.utcnow().date().isoformat())
+            etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()[:20]
+
+            stamps = [data_updated_at(scope, tenant) for scope, tenant in keys]
+            stamps = [stamp for stamp in stamps if stamp is not None]
+            last_modified = max(stamps).replace(tzinfo=timezone.utc, microsecond=0) if stamps else None
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None and not daily:
+                response.last_modified = last_modified
+            # Per-user pages: browsers may keep them but must revalidate, proxies may not
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapped
+    return decorator
+
+
+def init_app(app):
+    app.extensions['site_digest'] = _site_digest(app)
+    app.after_request(_compress)
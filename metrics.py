@@ -0,0 +1,150 @@
+# metrics.py
+"""Request, database and outbound HTTP instrumentation exposed at /metrics.
+
+When PROMETHEUS_MULTIPROC_DIR is set (gunicorn_config.py does this) every
+worker writes its samples to that directory and /metrics aggregates them, so
+the numbers cover all workers rather than whichever one served the scrape.
+The endpoint exists only when METRICS_TOKEN is set, and answers only scrapes
+bearing that token: the numbers reveal traffic and sales volume.
+"""
+import hmac
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, current_app, g, has_request_context, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,
+                               Gauge, Histogram, generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_log = logging.getLogger('benpharm.slow_requests')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by route',
+    ['method', 'endpoint', 'status'], buckets=LATENCY_BUCKETS)
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress', 'Requests currently being handled',
+    multiprocess_mode='livesum')
+WORKER_BUSY_SECONDS = Counter(
+    'worker_busy_seconds', 'Seconds workers spent handling requests')
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL statements executed per request', ['endpoint'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250))
+REQUEST_DB_SECONDS = Histogram(
+    'http_request_db_seconds', 'Time spent in SQL per request', ['endpoint'],
+    buckets=LATENCY_BUCKETS)
+DB_QUERY_LATENCY = Histogram(
+    'db_query_duration_seconds', 'Latency of individual SQL statements',
+    buckets=LATENCY_BUCKETS)
+EXTERNAL_LATENCY = Histogram(
+    'external_request_duration_seconds', 'Latency of outbound HTTP calls',
+    ['service', 'outcome'], buckets=LATENCY_BUCKETS)
+CACHE_REQUESTS = Counter(
+    'cache_requests', 'Cache lookups by cache and result', ['cache', 'result'])
+POS_SALES_INGESTED = Counter(
+    'pos_sales_ingested', 'Sales recorded, by checkout or offline sync', ['source'])
+DISEASE_REPORTS_TRIAGED = Counter(
+    'disease_reports_triaged', 'Disease reports changed through the officer triage API')
+LOGIN_REJECTIONS = Counter(
+    'login_rejections', 'Login attempts refused before checking the password', ['reason'])
+
+# Only this many statements are kept per request for the slow-request log
+MAX_RECORDED_STATEMENTS = 50
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    DB_QUERY_LATENCY.observe(elapsed)
+
+    if has_request_context() and 'metrics_start' in g:
+        g.sql_count += 1
+        g.sql_time += elapsed
+        if len(g.sql_statements) < MAX_RECORDED_STATEMENTS:
+            g.sql_statements.append((elapsed, statement))
+
+
+@contextmanager
+def external_call(service):
+    """Time an outbound HTTP call, e.g. ``with external_call('cohere'): ...``"""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        EXTERNAL_LATENCY.labels(service=service, outcome=outcome).observe(time.perf_counter() - start)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+
+def _endpoint_label():
+    return request.endpoint or 'unmatched'
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+    g.sql_count = 0
+    g.sql_time = 0.0
+    g.sql_statements = []
+    REQUESTS_IN_PROGRESS.inc()
+
+
+def _record_request(response):
+    if 'metrics_start' not in g:
+        return response
+
+    elapsed = time.perf_counter() - g.metrics_start
+    endpoint = _endpoint_label()
+
+    REQUEST_LATENCY.labels(method=request.method, endpoint=endpoint,
+                           status=response.status_code).observe(elapsed)
+    REQUEST_DB_QUERIES.labels(endpoint=endpoint).observe(g.sql_count)
+    REQUEST_DB_SECONDS.labels(endpoint=endpoint).observe(g.sql_time)
+
+    threshold = current_app.config.get('SLOW_REQUEST_MS', 0)
+    if threshold and elapsed * 1000 >= threshold:
+        slowest = sorted(g.sql_statements, key=lambda s: s[0], reverse=True)[:5]
+        slow_log.warning(
+            'Slow request %s %s -> %s in %.1fms (%d queries, %.1fms SQL)%s',
+            request.method, request.path, response.status_code, elapsed * 1000,
+            g.sql_count, g.sql_time * 1000,
+            ''.join(f'\n  [{t * 1000:.1f}ms] {s}' for t, s in slowest))
+    return response
+
+
+def _finish_request(exc):
+    if 'metrics_start' in g:
+        WORKER_BUSY_SECONDS.inc(time.perf_counter() - g.metrics_start)
+        REQUESTS_IN_PROGRESS.dec()
+
+
+def metrics_view():
+    expected = f"Bearer {current_app.config['METRICS_TOKEN']}"
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode()):
+        return Response('Unauthorized', 401, {'WWW-Authenticate': 'Bearer'})
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.teardown_request(_finish_request)
+    if app.config['METRICS_TOKEN']:
+        app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -1,6 +1,80 @@
 # migrations.py
+from sqlalchemy import Float, inspect, text
 from app import app, db
 
-with app.app_context():
+# Columns added after tables were first created; create_all() does not alter
+# existing tables, so add them here. (table, column, SQL type)
+ADDED_COLUMNS = [
+    ('sales', 'client_uuid', 'VARCHAR(36)'),
+    ('sale_items', 'unit_cost', 'NUMERIC(12, 2)'),
+    ('sale_items', 'agrovet_id', 'INTEGER REFERENCES users(id)'),
+]
+
+# Money columns that used to be FLOAT. (table, column)
+MONEY_COLUMNS = [
+    ('inventory_items', 'price'),
+    ('inventory_items', 'cost_price'),
+    ('customers', 'total_purchases'),
+    ('sales', 'total_amount'),
+    ('sale_items', 'unit_price'),
+    ('sale_items', 'subtotal'),
+]
+
+# (index name, table, columns, unique)
+ADDED_INDEXES = [
+    ('ix_sales_client_uuid', 'sales', 'client_uuid', True),
+    ('ix_sales_agrovet_id_sale_date', 'sales', 'agrovet_id, sale_date', False),
+    ('ix_sale_items_sale_id', 'sale_items', 'sale_id', False),
+    ('ix_sale_items_agrovet_id', 'sale_items', 'agrovet_id', False),
+    ('ix_inventory_items_agrovet_id', 'inventory_items', 'agrovet_id', False),
+    ('ix_disease_reports_created_at_id', 'disease_reports', 'created_at, id', False),
+    ('ix_disease_reports_location_created_at_id', 'disease_reports', 'location, created_at, id', False),
+    ('ix_disease_reports_status_created_at_id', 'disease_reports', 'status, created_at, id', False),
+]
+
+def backfill_sale_item_tenants(conn):
+    # sale_items.agrovet_id is a copy of its sale's agrovet_id
+    conn.execute(text('UPDATE sale_items SET agrovet_id = '
+                      '(SELECT sales.agrovet_id FROM sales WHERE sales.id = sale_items.sale_id) '
+                      'WHERE agrovet_id IS NULL'))
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('ALTER TABLE sale_items ALTER COLUMN agrovet_id SET NOT NULL'))
+
+def convert_money_columns(conn, inspector):
+    if conn.dialect.name == 'postgresql':
+        for table, column in MONEY_COLUMNS:
+            types = {c['name']: c['type'] for c in inspector.get_columns(table)}
+            if not isinstance(types[column], Float):
+                continue
+            conn.execute(text(f'ALTER TABLE {table} ALTER COLUMN {column} '
+                              f'TYPE NUMERIC(12, 2) USING round({column}::numeric, 2)'))
+    else:
+        # SQLite cannot change a column's type; its NUMERIC/REAL storage is
+        # read back as Decimal by the model, so just drop float noise
+        for table, column in MONEY_COLUMNS:
+            conn.execute(text(f'UPDATE {table} SET {column} = round({column}, 2) '
+                              f'WHERE {column} IS NOT NULL'))
+
+def upgrade():
     db.create_all()
-    print("Database tables created")
\ No newline at end of file
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table, column, sql_type in ADDED_COLUMNS:
+            if column not in {c['name'] for c in inspector.get_columns(table)}:
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {sql_type}'))
+                print(f"Added {table}.{column}")
+        backfill_sale_item_tenants(conn)
+        for name, table, columns, unique in ADDED_INDEXES:
+            # Checked by name: on a partitioned table (partitioning.py) the unique
+            # index already exists with the partition key added and cannot be
+            # created as listed here, even with IF NOT EXISTS
+            if name in {index['name'] for index in inspector.get_indexes(table)}:
+                continue
+            unique_sql = 'UNIQUE ' if unique else ''
+            conn.execute(text(f'CREATE {unique_sql}INDEX {name} ON {table} ({columns})'))
+        convert_money_columns(conn, inspector)
+
+if __name__ == '__main__':
+    with app.app_context():
+        upgrade()
+        print("Database tables created")
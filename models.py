@@ -1,10 +1,18 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from decimal import Decimal, ROUND_HALF_UP
+from werkzeug.security import check_password_hash
+from security import hash_password
 
 db = SQLAlchemy()
 
+# Prices and totals are exact decimals (KSh, 2 places); floats drift when summed
+Money = db.Numeric(12, 2)
+
+def to_money(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
     
@@ -28,7 +36,7 @@ class User(UserMixin, db.Model):
     notifications = db.relationship('Notification', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -37,14 +45,14 @@ class InventoryItem(db.Model):
     __tablename__ = 'inventory_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    agrovet_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    agrovet_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     product_name = db.Column(db.String(200), nullable=False)
     category = db.Column(db.String(100))
     description = db.Column(db.Text)
     quantity = db.Column(db.Integer, default=0)
     unit = db.Column(db.String(50))
-    price = db.Column(db.Float, nullable=False)
-    cost_price = db.Column(db.Float)
+    price = db.Column(Money, nullable=False)
+    cost_price = db.Column(Money)
     reorder_level = db.Column(db.Integer, default=10)
     supplier = db.Column(db.String(200))
     sku = db.Column(db.String(100))
@@ -67,7 +75,7 @@ class Customer(db.Model):
     customer_type = db.Column(db.String(50))
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    total_purchases = db.Column(db.Float, default=0.0)
+    total_purchases = db.Column(Money, default=0)
     last_purchase = db.Column(db.DateTime)
     
     purchases = db.relationship('Sale', backref='customer', lazy=True)
@@ -75,15 +83,19 @@ class Customer(db.Model):
 
 class Sale(db.Model):
     __tablename__ = 'sales'
+    # Tenant queries filter by shop and date range (dashboard, reports)
+    __table_args__ = (db.Index('ix_sales_agrovet_id_sale_date', 'agrovet_id', 'sale_date'),)
     
     id = db.Column(db.Integer, primary_key=True)
     agrovet_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'))
     sale_date = db.Column(db.DateTime, default=datetime.utcnow)
-    total_amount = db.Column(db.Float, nullable=False)
+    total_amount = db.Column(Money, nullable=False)
     payment_method = db.Column(db.String(50))
     status = db.Column(db.String(50), default='completed')
     receipt_number = db.Column(db.String(100), unique=True)
+    # Set by the offline POS queue so a resent sale is recognised, not applied twice
+    client_uuid = db.Column(db.String(36), unique=True)
     
     items = db.relationship('SaleItem', backref='sale', lazy=True, cascade='all, delete-orphan')
 
@@ -91,11 +103,15 @@ class SaleItem(db.Model):
     __tablename__ = 'sale_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    sale_id = db.Column(db.Integer, db.ForeignKey('sales.id'), nullable=False)
+    sale_id = db.Column(db.Integer, db.ForeignKey('sales.id'), nullable=False, index=True)
+    # Copy of sales.agrovet_id so tenant queries (and partitions) need no join
+    agrovet_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     product_name = db.Column(db.String(200), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
-    unit_price = db.Column(db.Float, nullable=False)
-    subtotal = db.Column(db.Float, nullable=False)
+    unit_price = db.Column(Money, nullable=False)
+    subtotal = db.Column(Money, nullable=False)
+    # Cost price at the time of sale, for margin reporting; NULL if unknown
+    unit_cost = db.Column(Money)
 
 class Communication(db.Model):
     __tablename__ = 'communications'
@@ -111,6 +127,12 @@ class Communication(db.Model):
 
 class DiseaseReport(db.Model):
     __tablename__ = 'disease_reports'
+    # Officer triage filters by region or status and pages newest first on (created_at, id)
+    __table_args__ = (
+        db.Index('ix_disease_reports_created_at_id', 'created_at', 'id'),
+        db.Index('ix_disease_reports_location_created_at_id', 'location', 'created_at', 'id'),
+        db.Index('ix_disease_reports_status_created_at_id', 'status', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     farmer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -148,3 +170,13 @@ class WeatherData(db.Model):
     recommendations = db.Column(db.Text)
     forecast_date = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Counter bumped by write routes; cache keys include it, so a write invalidates them
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+    
+    scope = db.Column(db.String(50), primary_key=True)
+    # 0 for platform-wide data, otherwise the owning user's id
+    tenant_id = db.Column(db.Integer, primary_key=True, default=0)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,230 @@
+# partitioning.py
+"""Tenant and time partitioning of the hot tables on Postgres.
+
+inventory_items and sale_items are hash-partitioned on agrovet_id, so a shop's
+rows sit in one of TENANT_HASH_PARTITIONS small tables and its scans, index
+depth and vacuum follow shop size rather than platform volume. sales is
+range-partitioned by calendar month on sale_date: dashboards and reports only
+touch recent months, and old months are archived by detaching their partition
+instead of deleting rows.
+
+    python partitioning.py partition                # one-off conversion, copies rows under lock
+    python partitioning.py ensure                   # create upcoming months; run daily
+    python partitioning.py archive --before 2024-01 # move older months to ARCHIVE_SCHEMA
+
+Postgres only enforces primary keys and uniqueness on partitioned tables when
+they include the partition key, so once converted:
+
+- sales' primary key is (id, sale_date), and receipt_number and client_uuid are
+  unique per sale_date. A resent offline sale carries the same created_at, so
+  it is still rejected as a duplicate.
+- inventory_items and sale_items have (id, agrovet_id) primary keys.
+- sale_items.sale_id has no foreign key to sales (it would need sale_date);
+  apply_sale always writes items together with their sale.
+
+ids still come from the tables' sequences, so they stay unique and the models
+are unchanged. SQLite databases are left as they are.
+"""
+import argparse
+import re
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from app import app, db
+from models import InventoryItem, Sale, SaleItem
+
+# table: (model, partition key)
+TENANT_TABLES = {
+    'inventory_items': (InventoryItem, 'agrovet_id'),
+    'sale_items': (SaleItem, 'agrovet_id'),
+}
+
+# Unique columns of sales, kept unique per sale_date: (index name, column)
+SALES_UNIQUE = [
+    ('sales_receipt_number_key', 'receipt_number'),
+    ('ix_sales_client_uuid', 'client_uuid'),
+]
+
+SALES_DEFAULT = 'sales_default'
+MONTH_PARTITION = re.compile(r'^sales_(\d{4})_(\d{2})$')
+
+
+def is_postgres(conn):
+    return conn.dialect.name == 'postgresql'
+
+
+def is_partitioned(conn, table):
+    return conn.execute(text('SELECT EXISTS (SELECT 1 FROM pg_partitioned_table '
+                             'WHERE partrelid = to_regclass(:table))'), {'table': table}).scalar()
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_partition_name(month):
+    return f'sales_{month:%Y_%m}'
+
+
+def month_partitions(conn):
+    """Months with an attached sales partition, oldest first."""
+    rows = conn.execute(text('SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+                             "WHERE i.inhparent = 'sales'::regclass")).scalars()
+    months = []
+    for name in rows:
+        match = MONTH_PARTITION.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def add_month_partition(conn, month):
+    """Attach a sales partition for ``month``, taking over any of its rows
+    that had landed in the default partition."""
+    name = month_partition_name(month)
+    bounds = {'start': month, 'end': add_months(month, 1)}
+    conn.execute(text(f'CREATE TABLE {name} (LIKE sales INCLUDING DEFAULTS)'))
+    conn.execute(text(f'INSERT INTO {name} SELECT * FROM {SALES_DEFAULT} '
+                      'WHERE sale_date >= :start AND sale_date < :end'), bounds)
+    conn.execute(text(f'DELETE FROM {SALES_DEFAULT} WHERE sale_date >= :start AND sale_date < :end'), bounds)
+    conn.execute(text(f"ALTER TABLE sales ATTACH PARTITION {name} "
+                      f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"))
+    return name
+
+
+def _recreate(conn, table, partition_by):
+    """Swap ``table`` for an empty partitioned copy and return the old table's
+    name; the caller creates the partitions, then calls _finish()."""
+    legacy = f'{table}_unpartitioned'
+    conn.execute(text(f'ALTER TABLE {table} RENAME TO {legacy}'))
+    conn.execute(text(f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY {partition_by}'))
+    return legacy
+
+
+def _finish(conn, table, model, legacy, primary_key, skip_foreign_keys=()):
+    sequence = conn.execute(text(f"SELECT pg_get_serial_sequence('{legacy}', 'id')")).scalar()
+    conn.execute(text(f'INSERT INTO {table} SELECT * FROM {legacy}'))
+    if sequence:
+        # Otherwise dropping the old table would drop the id sequence with it
+        conn.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id'))
+    # CASCADE drops foreign keys into the old table, i.e. sale_items.sale_id
+    conn.execute(text(f'DROP TABLE {legacy} CASCADE'))
+
+    conn.execute(text(f'ALTER TABLE {table} ADD PRIMARY KEY ({primary_key})'))
+    for index in model.__table__.indexes:
+        if not index.unique:
+            index.create(conn)
+    for fk in model.__table__.foreign_keys:
+        if fk.column.table.name in skip_foreign_keys:
+            continue
+        conn.execute(text(f'ALTER TABLE {table} ADD FOREIGN KEY ({fk.parent.name}) '
+                          f'REFERENCES {fk.column.table.name} ({fk.column.name})'))
+
+
+def partition_sales(conn, months_ahead):
+    legacy = _recreate(conn, 'sales', 'RANGE (sale_date)')
+    conn.execute(text(f'CREATE TABLE {SALES_DEFAULT} PARTITION OF sales DEFAULT'))
+
+    first = conn.execute(text(f'SELECT MIN(sale_date) FROM {legacy}')).scalar()
+    month = month_start(first or datetime.utcnow())
+    last = add_months(month_start(datetime.utcnow()), months_ahead)
+    while month <= last:
+        add_month_partition(conn, month)
+        month = add_months(month, 1)
+
+    _finish(conn, 'sales', Sale, legacy, 'id, sale_date')
+    for name, column in SALES_UNIQUE:
+        conn.execute(text(f'CREATE UNIQUE INDEX {name} ON sales ({column}, sale_date)'))
+
+
+def partition_tenant_table(conn, table, partitions):
+    model, key = TENANT_TABLES[table]
+    legacy = _recreate(conn, table, f'HASH ({key})')
+    for remainder in range(partitions):
+        conn.execute(text(f'CREATE TABLE {table}_p{remainder} PARTITION OF {table} '
+                          f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'))
+    _finish(conn, table, model, legacy, f'id, {key}', skip_foreign_keys=('sales',))
+
+
+def partition_tables(conn, config):
+    """Convert the hot tables to partitioned tables; already converted ones are skipped."""
+    converted = []
+    if not is_partitioned(conn, 'sales'):
+        partition_sales(conn, config['SALES_PARTITION_MONTHS_AHEAD'])
+        converted.append('sales')
+    for table in TENANT_TABLES:
+        if not is_partitioned(conn, table):
+            partition_tenant_table(conn, table, config['TENANT_HASH_PARTITIONS'])
+            converted.append(table)
+    conn.execute(text('ANALYZE sales, sale_items, inventory_items'))
+    return converted
+
+
+def ensure_sales_partitions(conn, months_ahead):
+    """Create this month's and the next ``months_ahead`` months' partitions."""
+    existing = set(month_partitions(conn))
+    month = month_start(datetime.utcnow())
+    created = []
+    for _ in range(months_ahead + 1):
+        if month not in existing:
+            created.append(add_month_partition(conn, month))
+        month = add_months(month, 1)
+    return created
+
+
+def archive_sales(conn, before, schema):
+    """Detach sales partitions for months before ``before`` and move them, with
+    their sale items, to ``schema``. Returns the archived partition names."""
+    conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS {schema}'))
+    conn.execute(text(f'CREATE TABLE IF NOT EXISTS {schema}.sale_items (LIKE sale_items INCLUDING DEFAULTS)'))
+
+    archived = []
+    for month in month_partitions(conn):
+        if month >= month_start(before):
+            break
+        name = month_partition_name(month)
+        conn.execute(text(f'ALTER TABLE sales DETACH PARTITION {name}'))
+        # Joining on agrovet_id as well lets each sale_items partition be matched separately
+        match = f'FROM {name} s WHERE s.id = si.sale_id AND s.agrovet_id = si.agrovet_id'
+        conn.execute(text(f'INSERT INTO {schema}.sale_items SELECT si.* FROM sale_items si '
+                          f'WHERE EXISTS (SELECT 1 {match})'))
+        conn.execute(text(f'DELETE FROM sale_items si USING {name} s '
+                          'WHERE s.id = si.sale_id AND s.agrovet_id = si.agrovet_id'))
+        conn.execute(text(f'ALTER TABLE {name} SET SCHEMA {schema}'))
+        archived.append(name)
+    return archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Partition and archive the hot tables (Postgres).')
+    parser.add_argument('command', choices=['partition', 'ensure', 'archive'])
+    parser.add_argument('--before', help='archive: first month to keep, YYYY-MM')
+    args = parser.parse_args()
+
+    with app.app_context(), db.engine.begin() as conn:
+        if not is_postgres(conn):
+            print('Partitioning needs Postgres; nothing to do')
+            return
+        config = app.config
+        if args.command == 'partition':
+            converted = partition_tables(conn, config)
+            print(f"Partitioned: {', '.join(converted) or 'nothing, already done'}")
+        elif args.command == 'ensure':
+            created = ensure_sales_partitions(conn, config['SALES_PARTITION_MONTHS_AHEAD'])
+            print(f"Created: {', '.join(created) or 'nothing, already there'}")
+        else:
+            if not args.before:
+                parser.error('archive needs --before YYYY-MM')
+            before = datetime.strptime(args.before, '%Y-%m').date()
+            archived = archive_sales(conn, before, config['ARCHIVE_SCHEMA'])
+            print(f"Archived to {config['ARCHIVE_SCHEMA']}: {', '.join(archived) or 'nothing'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+# pos.py
+"""Recording POS sales, one at a time or as an offline-queued batch."""
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from models import db, InventoryItem, Customer, Sale, SaleItem
+
+
+class SaleConflict(Exception):
+    """A sale that cannot be applied as sent, e.g. insufficient stock."""
+
+
+def well_formed(sale):
+    """Whether ``sale`` has the shape apply_sale expects: an object whose items are
+    objects, and whose payment method, if any, is text that fits the column."""
+    if not isinstance(sale, dict):
+        return False
+    items = sale.get('items')
+    payment_method = sale.get('payment_method')
+    return (isinstance(items, list) and all(isinstance(line, dict) for line in items)
+            and (payment_method is None or isinstance(payment_method, str)
+                 and len(payment_method) <= Sale.payment_method.type.length))
+
+
+def _parse_sale_date(value):
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    # Sale dates are stored as naive UTC
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def apply_sale(agrovet_id, cart_items, items_by_id, customers_by_id, customer_id=None,
+               payment_method='cash', receipt_number=None, client_uuid=None, sale_date=None):
+    """Add a Sale with its SaleItems to the session and take the stock.
+
+    ``items_by_id``/``customers_by_id`` are the agrovet's rows the cart may
+    reference, already loaded so a batch costs one query per table. Stock is
+    checked for the whole cart before anything is changed, so a SaleConflict
+    leaves the session untouched.
+    """
+    if not cart_items:
+        raise SaleConflict('Cart is empty')
+
+    customer = None
+    if customer_id:
+        customer = customers_by_id.get(int(customer_id))
+        if customer is None:
+            raise SaleConflict('Unknown customer')
+
+    lines = []
+    wanted = {}
+    for cart_item in cart_items:
+        item = items_by_id.get(int(cart_item.get('id')))
+        if item is None:
+            continue
+        quantity = int(cart_item.get('quantity', 0))
+        if quantity <= 0:
+            continue
+        wanted[item.id] = wanted.get(item.id, 0) + quantity
+        if item.quantity < wanted[item.id]:
+            raise SaleConflict(f'Insufficient stock for {item.product_name}')
+        lines.append((item, quantity))
+
+    if not lines:
+        raise SaleConflict('None of the items in this sale are in your inventory')
+
+    sale_date = sale_date or datetime.utcnow()
+    sale = Sale(
+        agrovet_id=agrovet_id,
+        customer_id=customer.id if customer else None,
+        sale_date=sale_date,
+        total_amount=0,
+        payment_method=payment_method,
+        receipt_number=receipt_number or f"RCP{agrovet_id}-{uuid.uuid4().hex[:12].upper()}",
+        client_uuid=client_uuid
+    )
+
+    total_amount = Decimal('0.00')
+    for item, quantity in lines:
+        subtotal = item.price * quantity
+        total_amount += subtotal
+        sale.items.append(SaleItem(
+            agrovet_id=agrovet_id,
+            product_name=item.product_name,
+            quantity=quantity,
+            unit_price=item.price,
+            unit_cost=item.cost_price,
+            subtotal=subtotal
+        ))
+        item.quantity -= quantity
+
+    sale.total_amount = total_amount
+    db.session.add(sale)
+
+    if customer:
+        customer.total_purchases = (customer.total_purchases or 0) + total_amount
+        if customer.last_purchase is None or customer.last_purchase < sale_date:
+            customer.last_purchase = sale_date
+
+    return sale
+
+
+def load_sale_context(agrovet_id, sales):
+    """Load and lock the inventory items and customers referenced by ``sales``
+    in two queries.
+
+    Stock and customer totals are then updated in Python, so the rows stay
+    locked until the caller commits; a concurrent checkout or sync for the same
+    items waits instead of passing the same stock check. Rows are locked in id
+    order so two batches cannot deadlock.
+    """
+    item_ids = set()
+    customer_ids = set()
+    for sale in sales:
+        # Malformed sales and ids are skipped here and reported by sync_sales and apply_sale
+        if not well_formed(sale):
+            continue
+        for line in sale['items']:
+            try:
+                item_ids.add(int(line.get('id')))
+            except (TypeError, ValueError):
+                pass
+        try:
+            if sale.get('customer_id'):
+                customer_ids.add(int(sale['customer_id']))
+        except (TypeError, ValueError):
+            pass
+
+    items_by_id = {}
+    if item_ids:
+        items = (InventoryItem.query.filter(InventoryItem.agrovet_id == agrovet_id,
+                                            InventoryItem.id.in_(item_ids))
+                 .order_by(InventoryItem.id).with_for_update().all())
+        items_by_id = {item.id: item for item in items}
+
+    customers_by_id = {}
+    if customer_ids:
+        customers = (Customer.query.filter(Customer.agrovet_id == agrovet_id,
+                                           Customer.id.in_(customer_ids))
+                     .order_by(Customer.id).with_for_update().all())
+        customers_by_id = {customer.id: customer for customer in customers}
+
+    return items_by_id, customers_by_id
+
+
+def sync_sales(agrovet_id, sales):
+    """Apply a batch of queued sales identified by client-generated UUIDs.
+
+    Sales whose UUID was already recorded are reported as duplicates instead
+    of being applied twice, so the client can safely resend a batch. Returns
+    one result per sale, in order; the caller commits.
+    """
+    uuids = []
+    for sale in sales:
+        try:
+            uuids.append(str(uuid.UUID(str(sale.get('client_uuid')))))
+        except ValueError:
+            uuids.append(None)
+
+    existing = {}
+    known = [u for u in uuids if u]
+    if known:
+        rows = Sale.query.filter(Sale.client_uuid.in_(known)).all()
+        existing = {row.client_uuid: row for row in rows}
+
+    items_by_id, customers_by_id = load_sale_context(agrovet_id, sales)
+
+    results = []
+    for sale_data, client_uuid in zip(sales, uuids):
+        if client_uuid is None:
+            results.append({'client_uuid': sale_data.get('client_uuid'), 'status': 'invalid',
+                            'error': 'client_uuid must be a UUID'})
+            continue
+
+        if not well_formed(sale_data):
+            results.append({'client_uuid': client_uuid, 'status': 'invalid', 'error': 'Malformed sale'})
+            continue
+
+        previous = existing.get(client_uuid)
+        if previous is not None:
+            if previous.agrovet_id != agrovet_id:
+                results.append({'client_uuid': client_uuid, 'status': 'invalid',
+                                'error': 'client_uuid already used'})
+            else:
+                results.append({'client_uuid': client_uuid, 'status': 'duplicate', 'sale': previous})
+            continue
+
+        customer_id = sale_data.get('customer_id')
+        try:
+            sale = apply_sale(
+                agrovet_id, sale_data.get('items') or [], items_by_id, customers_by_id,
+                customer_id=customer_id,
+                payment_method=sale_data.get('payment_method', 'cash'),
+                client_uuid=client_uuid,
+                sale_date=_parse_sale_date(sale_data.get('created_at'))
+            )
+        except SaleConflict as e:
+            results.append({'client_uuid': client_uuid, 'status': 'conflict', 'error': str(e)})
+            continue
+        except (AttributeError, TypeError, ValueError):
+            results.append({'client_uuid': client_uuid, 'status': 'invalid',
+                            'error': 'Malformed sale'})
+            continue
+
+        existing[client_uuid] = sale
+        results.append({'client_uuid': client_uuid, 'status': 'applied', 'sale': sale})
+
+    db.session.flush()
+    # Fill in ids only after the flush has assigned them
+    for result in results:
+        sale = result.pop('sale', None)
+        if sale is not None:
+            result.update(sale_id=sale.id, receipt_number=sale.receipt_number,
+                          total_amount=float(sale.total_amount))
+    return results
@@ -0,0 +1,153 @@
+# security.py
+"""Login throttling and bounded password-hash verification.
+
+Password hashing is deliberately expensive, so an unthrottled burst of login
+attempts can keep every worker busy hashing. Attempts are limited per client IP
+and per email with in-process token buckets. Verification needs one of
+PASSWORD_HASH_WORKERS slots shared by all workers on the host, so with the
+default of one, a login flood ties up at most one gunicorn worker and the rest
+keep serving POS and dashboards; a login that cannot get a slot within
+PASSWORD_HASH_WAIT seconds is refused. The worker is blocked while it
+verifies (or waits), so the limit has to hold across processes rather than
+within one, hence lock files.
+"""
+import os
+import threading
+import time
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: slots are only shared within one process
+    fcntl = None
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashPoolBusy(Exception):
+    """Raised when no verification slot came free in time."""
+
+
+class TokenBucket:
+    """Per-key token buckets: ``capacity`` burst, refilled at ``rate`` tokens/second."""
+
+    # Idle keys are pruned once this many are tracked
+    MAX_KEYS = 10000
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            if len(self._buckets) >= self.MAX_KEYS and key not in self._buckets:
+                self._prune(now)
+            self._buckets[key] = (tokens, now)
+            return allowed
+
+    def _prune(self, now):
+        # A bucket that would be full again carries no state worth keeping
+        full_after = self.capacity / self.rate if self.rate else float('inf')
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < full_after}
+
+
+class HashSlots:
+    """``count`` slots shared by every process using ``directory``, one lock file each.
+
+    flock() locks are released by the kernel when their holder exits, so a
+    crashed worker cannot leak a slot.
+    """
+
+    POLL_SECONDS = 0.01
+
+    def __init__(self, directory, count):
+        os.makedirs(directory, exist_ok=True)
+        self._paths = [os.path.join(directory, f'slot{i}.lock') for i in range(count)]
+        self._local = threading.BoundedSemaphore(count)
+
+    def _try_acquire(self):
+        if fcntl is None:
+            return self._local if self._local.acquire(blocking=False) else None
+        for path in self._paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def acquire(self, wait):
+        """A slot token for release(); raises HashPoolBusy after ``wait`` seconds."""
+        deadline = time.monotonic() + wait
+        while True:
+            token = self._try_acquire()
+            if token is not None:
+                return token
+            if time.monotonic() >= deadline:
+                raise HashPoolBusy()
+            time.sleep(self.POLL_SECONDS)
+
+    def release(self, token):
+        if token is self._local:
+            self._local.release()
+        else:
+            fcntl.flock(token, fcntl.LOCK_UN)
+            os.close(token)
+
+
+class LoginGuard:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self.by_ip = TokenBucket(config['LOGIN_IP_BURST'], config['LOGIN_IP_PER_MINUTE'] / 60)
+        self.by_email = TokenBucket(config['LOGIN_EMAIL_BURST'], config['LOGIN_EMAIL_PER_MINUTE'] / 60)
+        self._slots = HashSlots(config['PASSWORD_HASH_LOCK_DIR'], config['PASSWORD_HASH_WORKERS'])
+        self._wait = config['PASSWORD_HASH_WAIT']
+        app.extensions['login_guard'] = self
+
+    def allow(self, ip, email):
+        # Check both so a blocked email still drains the caller's IP bucket
+        ip_ok = self.by_ip.allow(ip)
+        email_ok = self.by_email.allow((email or '').strip().lower())
+        return ip_ok and email_ok
+
+    def verify(self, password_hash, password):
+        token = self._slots.acquire(self._wait)
+        try:
+            return check_password_hash(password_hash, password)
+        finally:
+            self._slots.release(token)
+
+
+@lru_cache(maxsize=8)
+def _hash_prefix(method):
+    # werkzeug expands short method names ("scrypt") into the full parameter
+    # string it stores, so derive it from a real hash once per process
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def hash_password(password):
+    config = current_app.config
+    return generate_password_hash(password, method=config['PASSWORD_HASH_METHOD'],
+                                  salt_length=config['PASSWORD_SALT_LENGTH'])
+
+
+def needs_rehash(password_hash):
+    # Stored as method$salt$hash: rehash when either configured parameter changed
+    config = current_app.config
+    method, salt = (password_hash.split('$') + ['', ''])[:2]
+    return (method != _hash_prefix(config['PASSWORD_HASH_METHOD'])
+            or len(salt) != config['PASSWORD_SALT_LENGTH'])
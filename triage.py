@@ -0,0 +1,205 @@
+# triage.py
+"""Batch triage of disease reports by extension officers.
+
+Reports are listed newest first with keyset pagination: a page's cursor is the
+(created_at, id) of its last report and the next page starts strictly after
+it, so page 500 of an outbreak costs the same index range scan as page 1,
+unlike OFFSET. A triage batch issues one UPDATE per distinct decision (after an
+outbreak, typically the same diagnosis for hundreds of reports), and each
+affected farmer gets a single Notification, all inserted in one statement.
+"""
+import base64
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.orm import joinedload
+
+from models import db, DiseaseReport, Notification
+
+STATUSES = ('pending', 'reviewed', 'resolved')
+
+# Report columns an officer may set in a triage batch
+TRIAGE_FIELDS = ('status', 'disease_detected', 'confidence')
+
+
+class TriageError(Exception):
+    """A triage request that cannot be acted on, e.g. an unknown status."""
+
+
+def encode_cursor(report):
+    raw = f'{report.created_at.isoformat()}|{report.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, report_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(report_id)
+    except ValueError:
+        raise TriageError('Invalid cursor')
+
+
+def parse_day(value, field):
+    """A YYYY-MM-DD query parameter as a datetime at midnight, or None."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise TriageError(f'{field} must be a date (YYYY-MM-DD)')
+
+
+def clean_fields(data):
+    """The triage fields present in ``data``, validated; absent ones are left out."""
+    fields = {}
+    if 'status' in data:
+        if data['status'] not in STATUSES:
+            raise TriageError(f"status must be one of {', '.join(STATUSES)}")
+        fields['status'] = data['status']
+    if 'disease_detected' in data:
+        disease = data['disease_detected']
+        if disease is not None:
+            if not isinstance(disease, str):
+                raise TriageError('disease_detected must be text')
+            disease = disease.strip()[:200] or None
+        fields['disease_detected'] = disease
+    if 'confidence' in data:
+        confidence = data['confidence']
+        if confidence is not None:
+            if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) \
+                    or not 0 <= confidence <= 1:
+                raise TriageError('confidence must be a number between 0 and 1')
+            confidence = float(confidence)
+        fields['confidence'] = confidence
+    return fields
+
+
+def search_reports(region=None, status=None, since=None, until=None, cursor=None, limit=100):
+    """One page of reports, newest first, and the cursor of the next page (or None).
+
+    ``region`` matches the report's location exactly; ``since`` and ``until``
+    are days, both included.
+    """
+    query = DiseaseReport.query.options(joinedload(DiseaseReport.farmer))
+    if region:
+        query = query.filter(DiseaseReport.location == region)
+    if status:
+        query = query.filter(DiseaseReport.status == status)
+    if since:
+        query = query.filter(DiseaseReport.created_at >= since)
+    if until:
+        query = query.filter(DiseaseReport.created_at < until + timedelta(days=1))
+    if cursor:
+        query = query.filter(tuple_(DiseaseReport.created_at, DiseaseReport.id) < decode_cursor(cursor))
+
+    # One extra row tells whether there is a next page
+    reports = query.order_by(DiseaseReport.created_at.desc(), DiseaseReport.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(reports[limit - 1]) if len(reports) > limit else None
+    return reports[:limit], next_cursor
+
+
+def report_json(report):
+    return {
+        'id': report.id,
+        'farmer_id': report.farmer_id,
+        'farmer_name': report.farmer.full_name,
+        'location': report.location,
+        'latitude': report.latitude,
+        'longitude': report.longitude,
+        'plant_description': report.plant_description,
+        'disease_detected': report.disease_detected,
+        'confidence': report.confidence,
+        'status': report.status,
+        'created_at': report.created_at.isoformat(),
+    }
+
+
+def _notification(farmer_id, changes, link):
+    if len(changes) == 1:
+        created_at, fields = changes[0]
+        message = f"An extension officer marked your report from {created_at:%d %b %Y} as {fields['status']}."
+        if fields['disease_detected']:
+            message += f" Diagnosis: {fields['disease_detected']}"
+            if fields['confidence'] is not None:
+                message += f" ({fields['confidence']:.0%} confidence)"
+            message += '.'
+        title = f"Disease report {fields['status']}"
+    else:
+        message = (f'An extension officer updated {len(changes)} of your disease reports. '
+                   'See your dashboard for the diagnoses.')
+        title = 'Disease reports updated'
+    return {'user_id': farmer_id, 'title': title, 'message': message,
+            'notification_type': 'disease_report', 'link': link}
+
+
+def triage_reports(entries, defaults=None, link=None):
+    """Apply a batch of triage decisions.
+
+    Each entry is ``{'id': ..., 'status': ..., 'disease_detected': ...,
+    'confidence': ...}``; a field it leaves out is taken from ``defaults``,
+    else kept as it is. Changed reports are updated with one statement per
+    distinct decision and each of their farmers is notified once. Returns one
+    result per entry, in order, and the ids of the farmers notified; the
+    caller commits.
+    """
+    defaults = defaults or {}
+    ids = []
+    for entry in entries:
+        try:
+            ids.append(int(entry.get('id')))
+        except (TypeError, ValueError):
+            ids.append(None)
+
+    # Locked in id order, so concurrent batches over the same reports cannot deadlock
+    rows = db.session.execute(
+        select(DiseaseReport.id, DiseaseReport.farmer_id, DiseaseReport.created_at,
+               DiseaseReport.status, DiseaseReport.disease_detected, DiseaseReport.confidence)
+        .where(DiseaseReport.id.in_({report_id for report_id in ids if report_id is not None}))
+        .order_by(DiseaseReport.id).with_for_update()
+    ).all()
+    current = {row.id: row for row in rows}
+
+    results = []
+    decisions = {}
+    seen = set()
+    changes_by_farmer = {}
+    for entry, report_id in zip(entries, ids):
+        if report_id is None:
+            results.append({'id': entry.get('id'), 'result': 'invalid', 'error': 'id must be an integer'})
+            continue
+        if report_id in seen:
+            results.append({'id': report_id, 'result': 'invalid', 'error': 'Report listed twice'})
+            continue
+        seen.add(report_id)
+
+        row = current.get(report_id)
+        if row is None:
+            results.append({'id': report_id, 'result': 'not_found'})
+            continue
+        try:
+            fields = dict(defaults, **clean_fields(entry))
+        except TriageError as e:
+            results.append({'id': report_id, 'result': 'invalid', 'error': str(e)})
+            continue
+        if not fields:
+            results.append({'id': report_id, 'result': 'invalid', 'error': 'Nothing to update'})
+            continue
+
+        new = {field: fields.get(field, getattr(row, field)) for field in TRIAGE_FIELDS}
+        if all(new[field] == getattr(row, field) for field in TRIAGE_FIELDS):
+            results.append({'id': report_id, 'result': 'unchanged'})
+            continue
+        decisions.setdefault(tuple(new[field] for field in TRIAGE_FIELDS), []).append(report_id)
+        changes_by_farmer.setdefault(row.farmer_id, []).append((row.created_at, new))
+        results.append({'id': report_id, 'result': 'updated'})
+
+    # Reports given the same decision share one UPDATE ... WHERE id IN (...)
+    for values, report_ids in decisions.items():
+        db.session.execute(update(DiseaseReport).where(DiseaseReport.id.in_(report_ids))
+                           .values(dict(zip(TRIAGE_FIELDS, values)))
+                           .execution_options(synchronize_session=False))
+    if changes_by_farmer:
+        db.session.execute(insert(Notification), [_notification(farmer_id, changes, link)
+                                                  for farmer_id, changes in changes_by_farmer.items()])
+    return results, list(changes_by_farmer)